@@ -1,11 +1,18 @@
 """Admin API endpoints."""
+import hmac
 import logging
 from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, status
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from pydantic import TypeAdapter
 
+from app.cache.stats_cache import (
+    ORDER_STATS_KEY, PRODUCT_STATS_KEY, USER_STATS_KEY, cached_json
+)
 from app.config import settings
+from app.database import get_pool_status
 from app.schemas.user import UserResponse, UserStats
 from app.schemas.product import ProductResponse, ProductStats
 from app.schemas.order import OrderResponse, OrderStats
@@ -15,19 +22,23 @@ from app.services.order_service import OrderService
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(tags=["admin"])
 security = HTTPBearer()
 
+# Reused list validators; responses are serialized directly from them
+_PRODUCT_LIST_ADAPTER = TypeAdapter(List[ProductResponse])
+_ORDER_LIST_ADAPTER = TypeAdapter(List[OrderResponse])
+
+
+# Settings are immutable at runtime, so resolve the environment once
+_IS_PRODUCTION = settings.is_production
+
+# TODO: Implement proper token verification
+ADMIN_API_TOKEN = "admin-token"
+
 
 async def verify_admin_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> bool:
     """Verify admin API token."""
-    # In production, implement proper token verification
-    # For now, we'll use a simple check
-    if not settings.is_production:
-        return True
-    
-    # TODO: Implement proper token verification
-    if credentials.credentials != "admin-token":
+    if not hmac.compare_digest(credentials.credentials.encode(), ADMIN_API_TOKEN.encode()):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication token"
@@ -35,13 +46,30 @@ async def verify_admin_token(credentials: HTTPAuthorizationCredentials = Depends
     return True
 
 
+async def allow_admin() -> bool:
+    """Skip admin token verification outside production."""
+    return True
+
+
+# Runs for every admin endpoint without being bound to a handler parameter
+router = APIRouter(
+    tags=["admin"],
+    default_response_class=ORJSONResponse,
+    dependencies=[Depends(verify_admin_token if _IS_PRODUCTION else allow_admin)]
+)
+
+
 @router.get("/stats/users", response_model=UserStats)
-async def get_user_stats(admin: bool = Depends(verify_admin_token)) -> UserStats:
+async def get_user_stats() -> Response:
     """Get user statistics."""
     try:
-        return await UserService.get_user_stats()
+        # Cached JSON is sent as-is, without re-validation
+        body = await cached_json(
+            USER_STATS_KEY, settings.stats_cache_ttl, UserService.get_user_stats
+        )
+        return Response(body, media_type="application/json")
     except Exception as e:
-        logger.error(f"Error getting user stats: {e}")
+        logger.error("Error getting user stats: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get user statistics"
@@ -49,12 +77,15 @@ async def get_user_stats(admin: bool = Depends(verify_admin_token)) -> UserStats
 
 
 @router.get("/stats/products", response_model=ProductStats)
-async def get_product_stats(admin: bool = Depends(verify_admin_token)) -> ProductStats:
+async def get_product_stats() -> Response:
     """Get product statistics."""
     try:
-        return await ProductService.get_product_stats()
+        body = await cached_json(
+            PRODUCT_STATS_KEY, settings.stats_cache_ttl, ProductService.get_product_stats
+        )
+        return Response(body, media_type="application/json")
     except Exception as e:
-        logger.error(f"Error getting product stats: {e}")
+        logger.error("Error getting product stats: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get product statistics"
@@ -62,20 +93,29 @@ async def get_product_stats(admin: bool = Depends(verify_admin_token)) -> Produc
 
 
 @router.get("/stats/orders", response_model=OrderStats)
-async def get_order_stats(admin: bool = Depends(verify_admin_token)) -> OrderStats:
+async def get_order_stats() -> Response:
     """Get order statistics."""
     try:
-        return await OrderService.get_order_stats()
+        body = await cached_json(
+            ORDER_STATS_KEY, settings.stats_cache_ttl, OrderService.get_order_stats
+        )
+        return Response(body, media_type="application/json")
     except Exception as e:
-        logger.error(f"Error getting order stats: {e}")
+        logger.error("Error getting order stats: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get order statistics"
         )
 
 
+@router.get("/stats/pool")
+async def get_pool_stats() -> dict:
+    """Get database connection pool statistics."""
+    return get_pool_status()
+
+
 @router.get("/users/{telegram_id}", response_model=UserResponse)
-async def get_user(telegram_id: int, admin: bool = Depends(verify_admin_token)) -> UserResponse:
+async def get_user(telegram_id: int) -> Response:
     """Get user by Telegram ID."""
     try:
         user = await UserService.get_by_telegram_id(telegram_id)
@@ -84,11 +124,15 @@ async def get_user(telegram_id: int, admin: bool = Depends(verify_admin_token))
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
-        return UserResponse.model_validate(user)
+        # Serialized by pydantic-core; skips FastAPI's response_model re-validation
+        return Response(
+            UserResponse.model_validate(user).model_dump_json(),
+            media_type="application/json"
+        )
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting user: {e}")
+        logger.error("Error getting user: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get user"
@@ -96,28 +140,21 @@ async def get_user(telegram_id: int, admin: bool = Depends(verify_admin_token))
 
 
 @router.post("/users/{telegram_id}/ban")
-async def ban_user(telegram_id: int, admin: bool = Depends(verify_admin_token)) -> dict:
+async def ban_user(telegram_id: int) -> dict:
     """Ban a user."""
     try:
-        user = await UserService.get_by_telegram_id(telegram_id)
-        if not user:
+        user_id = await UserService.set_banned_by_telegram_id(telegram_id, banned=True)
+        if user_id is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
         
-        success = await UserService.ban_user(user.id, ban=True)
-        if success:
-            return {"status": "success", "message": f"User {telegram_id} banned"}
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Failed to ban user"
-            )
+        return {"status": "success", "message": f"User {telegram_id} banned"}
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error banning user: {e}")
+        logger.error("Error banning user: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to ban user"
@@ -125,28 +162,21 @@ async def ban_user(telegram_id: int, admin: bool = Depends(verify_admin_token))
 
 
 @router.delete("/users/{telegram_id}/ban")
-async def unban_user(telegram_id: int, admin: bool = Depends(verify_admin_token)) -> dict:
+async def unban_user(telegram_id: int) -> dict:
     """Unban a user."""
     try:
-        user = await UserService.get_by_telegram_id(telegram_id)
-        if not user:
+        user_id = await UserService.set_banned_by_telegram_id(telegram_id, banned=False)
+        if user_id is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
         
-        success = await UserService.ban_user(user.id, ban=False)
-        if success:
-            return {"status": "success", "message": f"User {telegram_id} unbanned"}
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Failed to unban user"
-            )
+        return {"status": "success", "message": f"User {telegram_id} unbanned"}
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error unbanning user: {e}")
+        logger.error("Error unbanning user: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to unban user"
@@ -158,20 +188,40 @@ async def get_products(
     category: Optional[str] = None,
     is_active: Optional[bool] = None,
     limit: Optional[int] = 50,
-    offset: int = 0,
-    admin: bool = Depends(verify_admin_token)
-) -> List[ProductResponse]:
-    """Get products list."""
+    after_id: Optional[int] = None,
+    offset: int = Query(default=0, deprecated=True)
+) -> Response:
+    """Get products list.
+    
+    Pages are returned in id order; pass the X-Next-Cursor header value
+    as after_id to get the next page.
+    """
     try:
-        products = await ProductService.get_all_products(
-            category=category,
-            is_active=is_active,
-            limit=limit,
-            offset=offset
+        if offset and after_id is None:
+            products = await ProductService.get_all_products(
+                category=category,
+                is_active=is_active,
+                limit=limit,
+                offset=offset
+            )
+        else:
+            products = await ProductService.get_all_products(
+                category=category,
+                is_active=is_active,
+                limit=limit,
+                after_id=after_id or 0
+            )
+        
+        validated = _PRODUCT_LIST_ADAPTER.validate_python(products, from_attributes=True)
+        response = Response(
+            _PRODUCT_LIST_ADAPTER.dump_json(validated),
+            media_type="application/json"
         )
-        return [ProductResponse.model_validate(product) for product in products]
+        if limit and len(products) == limit and not (offset and after_id is None):
+            response.headers["X-Next-Cursor"] = str(products[-1].id)
+        return response
     except Exception as e:
-        logger.error(f"Error getting products: {e}")
+        logger.error("Error getting products: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get products"
@@ -180,21 +230,33 @@ async def get_products(
 
 @router.get("/orders", response_model=List[OrderResponse])
 async def get_orders(
-    status: Optional[str] = None,
+    order_status: Optional[str] = Query(default=None, alias="status"),
     limit: Optional[int] = 50,
-    offset: int = 0,
-    admin: bool = Depends(verify_admin_token)
-) -> List[OrderResponse]:
-    """Get orders list."""
+    after_id: Optional[int] = None,
+    offset: int = Query(default=0, deprecated=True)
+) -> Response:
+    """Get orders list, newest first.
+    
+    Pass the X-Next-Cursor header value as after_id to get the next page.
+    """
     try:
         orders = await OrderService.get_all_orders(
-            status=status,
+            status=order_status,
             limit=limit,
-            offset=offset
+            offset=offset,
+            after_id=after_id
+        )
+        
+        validated = _ORDER_LIST_ADAPTER.validate_python(orders, from_attributes=True)
+        response = Response(
+            _ORDER_LIST_ADAPTER.dump_json(validated),
+            media_type="application/json"
         )
-        return [OrderResponse.model_validate(order) for order in orders]
+        if limit and len(orders) == limit and not (offset and after_id is None):
+            response.headers["X-Next-Cursor"] = str(orders[-1].id)
+        return response
     except Exception as e:
-        logger.error(f"Error getting orders: {e}")
+        logger.error("Error getting orders: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get orders"
@@ -202,7 +264,7 @@ async def get_orders(
 
 
 @router.post("/orders/cleanup")
-async def cleanup_orders(admin: bool = Depends(verify_admin_token)) -> dict:
+async def cleanup_orders() -> dict:
     """Cleanup expired orders."""
     try:
         expired_count = await OrderService.expire_pending_orders()
@@ -212,7 +274,7 @@ async def cleanup_orders(admin: bool = Depends(verify_admin_token)) -> dict:
             "message": f"Cleaned up {expired_count} expired orders"
         }
     except Exception as e:
-        logger.error(f"Error cleaning up orders: {e}")
+        logger.error("Error cleaning up orders: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to cleanup orders"
@@ -220,7 +282,7 @@ async def cleanup_orders(admin: bool = Depends(verify_admin_token)) -> dict:
 
 
 @router.post("/products/load")
-async def load_products(admin: bool = Depends(verify_admin_token)) -> dict:
+async def load_products() -> dict:
     """Load products from JSON file."""
     try:
         loaded_count = await ProductService.load_products_from_json()
@@ -230,7 +292,7 @@ async def load_products(admin: bool = Depends(verify_admin_token)) -> dict:
             "message": f"Loaded {loaded_count} products from JSON"
         }
     except Exception as e:
-        logger.error(f"Error loading products: {e}")
+        logger.error("Error loading products: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to load products"
@@ -238,7 +300,7 @@ async def load_products(admin: bool = Depends(verify_admin_token)) -> dict:
 
 
 @router.post("/products/export")
-async def export_products(admin: bool = Depends(verify_admin_token)) -> dict:
+async def export_products() -> dict:
     """Export products to JSON file."""
     try:
         success = await ProductService.export_products_to_json()
@@ -255,7 +317,7 @@ async def export_products(admin: bool = Depends(verify_admin_token)) -> dict:
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error exporting products: {e}")
+        logger.error("Error exporting products: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to export products"
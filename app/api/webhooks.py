@@ -2,14 +2,33 @@
 import logging
 from typing import Dict, Any
 
-from fastapi import APIRouter, HTTPException, Request, status
-from pydantic import BaseModel
+import orjson
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ValidationError
 
+from app.api.routing import ORJSONRoute
+from app.cache.backend import cache_add, cache_delete
 from app.services.payment_service import PaymentService
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(tags=["webhooks"])
+router = APIRouter(
+    tags=["webhooks"],
+    route_class=ORJSONRoute,
+    default_response_class=ORJSONResponse
+)
+
+# Gateways retry deliveries; remember processed callbacks for a day
+WEBHOOK_DEDUP_TTL = 86400
+
+# Health check body never changes, so the response is built once
+_HEALTHY = ORJSONResponse({"status": "healthy", "service": "digital-store-webhooks"})
+
+
+def _dedup_key(gateway: str, payment_id: str, payment_status: Any) -> str:
+    """Build idempotency key for a webhook delivery."""
+    return f"wh:{gateway}:{payment_id}:{payment_status or ''}"
 
 
 class CryptomusWebhook(BaseModel):
@@ -24,33 +43,72 @@ class CryptomusWebhook(BaseModel):
 
 
 @router.post("/cryptomus")
-async def cryptomus_webhook(payload: CryptomusWebhook) -> Dict[str, Any]:
+async def cryptomus_webhook(request: Request) -> Dict[str, Any]:
     """Handle Cryptomus payment webhook."""
     try:
-        logger.info(f"Received Cryptomus webhook: {payload.uuid}")
+        raw_body = await request.body()
+        try:
+            callback_data = orjson.loads(raw_body)
+        except orjson.JSONDecodeError:
+            callback_data = None
         
-        # Convert to dict for processing
-        callback_data = payload.model_dump()
+        if not isinstance(callback_data, dict):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid payload"
+            )
+        
+        # Reject forged callbacks before any further processing
+        if not PaymentService.verify_cryptomus_signature(callback_data):
+            logger.warning("Invalid Cryptomus webhook signature")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid signature"
+            )
+        
+        try:
+            payload = CryptomusWebhook.model_validate(callback_data)
+        except ValidationError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid payload"
+            )
+        
+        logger.info("Received Cryptomus webhook: %s", payload.uuid)
+        
+        # Skip retried deliveries of an already processed callback
+        dedup_key = _dedup_key("cryptomus", payload.uuid, payload.status)
+        if not await cache_add(dedup_key, b"1", WEBHOOK_DEDUP_TTL):
+            logger.info("Duplicate Cryptomus webhook: %s", payload.uuid)
+            return {"status": "success", "dedup": True}
         
         # Process payment callback
-        success = await PaymentService.handle_payment_callback(
-            gateway="cryptomus",
-            payment_id=payload.uuid,
-            callback_data=callback_data
-        )
+        try:
+            success = await PaymentService.handle_payment_callback(
+                gateway="cryptomus",
+                payment_id=payload.uuid,
+                callback_data=callback_data
+            )
+        except Exception:
+            await cache_delete(dedup_key)
+            raise
         
         if success:
-            logger.info(f"Cryptomus webhook processed successfully: {payload.uuid}")
+            logger.info("Cryptomus webhook processed successfully: %s", payload.uuid)
             return {"status": "success"}
         else:
-            logger.error(f"Failed to process Cryptomus webhook: {payload.uuid}")
+            # Let the gateway retry
+            await cache_delete(dedup_key)
+            logger.error("Failed to process Cryptomus webhook: %s", payload.uuid)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Failed to process webhook"
             )
             
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error processing Cryptomus webhook: {e}")
+        logger.error("Error processing Cryptomus webhook: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
@@ -62,7 +120,7 @@ async def telegram_stars_webhook(request: Request) -> Dict[str, Any]:
     """Handle Telegram Stars payment webhook."""
     try:
         payload = await request.json()
-        logger.info(f"Received Telegram Stars webhook")
+        logger.info("Received Telegram Stars webhook")
         
         # Extract payment information
         payment_id = payload.get("payment_id")
@@ -72,25 +130,39 @@ async def telegram_stars_webhook(request: Request) -> Dict[str, Any]:
                 detail="Missing payment_id"
             )
         
+        # Skip retried deliveries of an already processed callback
+        dedup_key = _dedup_key("telegram_stars", payment_id, payload.get("status"))
+        if not await cache_add(dedup_key, b"1", WEBHOOK_DEDUP_TTL):
+            logger.info("Duplicate Telegram Stars webhook: %s", payment_id)
+            return {"status": "success", "dedup": True}
+        
         # Process payment callback
-        success = await PaymentService.handle_payment_callback(
-            gateway="telegram_stars",
-            payment_id=payment_id,
-            callback_data=payload
-        )
+        try:
+            success = await PaymentService.handle_payment_callback(
+                gateway="telegram_stars",
+                payment_id=payment_id,
+                callback_data=payload
+            )
+        except Exception:
+            await cache_delete(dedup_key)
+            raise
         
         if success:
-            logger.info(f"Telegram Stars webhook processed successfully: {payment_id}")
+            logger.info("Telegram Stars webhook processed successfully: %s", payment_id)
             return {"status": "success"}
         else:
-            logger.error(f"Failed to process Telegram Stars webhook: {payment_id}")
+            # Let the gateway retry
+            await cache_delete(dedup_key)
+            logger.error("Failed to process Telegram Stars webhook: %s", payment_id)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Failed to process webhook"
             )
             
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error processing Telegram Stars webhook: {e}")
+        logger.error("Error processing Telegram Stars webhook: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
@@ -98,6 +170,6 @@ async def telegram_stars_webhook(request: Request) -> Dict[str, Any]:
 
 
 @router.get("/health")
-async def health_check() -> Dict[str, str]:
+async def health_check() -> Response:
     """Health check endpoint."""
-    return {"status": "healthy", "service": "digital-store-webhooks"}
\ No newline at end of file
+    return _HEALTHY
\ No newline at end of file
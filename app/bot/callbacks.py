@@ -0,0 +1,75 @@
+"""Callback data factories for inline keyboards."""
+from typing import Type, Union
+
+from aiogram.filters import Filter
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery
+
+
+class CategoryCB(CallbackData, prefix="category"):
+    """Product category selection."""
+    name: str
+
+
+class ProductsPageCB(CallbackData, prefix="products"):
+    """Page of products in a category; cursor is ">id" or "<id"."""
+    category: str
+    cursor: str
+
+
+class ProductCB(CallbackData, prefix="product"):
+    """Product details."""
+    id: int
+
+
+class BuyCB(CallbackData, prefix="buy"):
+    """Buy product with default payment gateway."""
+    id: int
+
+
+class BuyStarsCB(CallbackData, prefix="buy_stars"):
+    """Buy product with Telegram Stars."""
+    id: int
+
+
+class OrdersPageCB(CallbackData, prefix="orders"):
+    """Page of user orders; cursor is ">id" or "<id"."""
+    cursor: str
+
+
+class OrderCB(CallbackData, prefix="order"):
+    """Order details."""
+    id: int
+
+
+class PayOrderCB(CallbackData, prefix="pay_order"):
+    """Payment options for order."""
+    id: int
+
+
+class PayCB(CallbackData, prefix="pay"):
+    """Pay order with given payment method."""
+    kind: str
+    id: int
+
+
+class CancelOrderCB(CallbackData, prefix="cancel_order"):
+    """Cancel order."""
+    id: int
+
+
+class CallbackPrefix(Filter):
+    """Match callbacks whose data prefix (text before the first ":") is known.
+    
+    Used as a router-level gate so a router's handler filters are only
+    evaluated for callbacks that belong to it.
+    """
+    
+    def __init__(self, *prefixes: Union[str, Type[CallbackData]]):
+        self.prefixes = frozenset(
+            prefix if isinstance(prefix, str) else prefix.__prefix__
+            for prefix in prefixes
+        )
+    
+    async def __call__(self, callback: CallbackQuery) -> bool:
+        return bool(callback.data) and callback.data.split(":", 1)[0] in self.prefixes
@@ -1,5 +1,7 @@
 """Admin panel handlers."""
+import asyncio
 import logging
+import re
 from typing import Any
 
 from aiogram import Router, F
@@ -7,14 +9,126 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 from aiogram.enums import ParseMode
 
-from app.bot.keyboards import admin_keyboard, back_keyboard, confirmation_keyboard
+from app.bot.callbacks import CallbackPrefix
+from app.bot.keyboards import (
+    admin_keyboard, admin_orders_keyboard, admin_products_keyboard,
+    back_keyboard, confirmation_keyboard
+)
+from app.cache.stats_cache import (
+    ADMIN_STATS_KEY, ORDER_STATS_KEY, PRODUCT_STATS_KEY, USER_STATS_KEY, cached
+)
+from app.config import settings
+from app.schemas.order import OrderStats
+from app.schemas.product import ProductStats
+from app.schemas.stats import AdminStats
+from app.schemas.user import UserStats
 from app.services.user_service import UserService
 from app.services.product_service import ProductService
 from app.services.order_service import OrderService
+from app.services.stats_service import StatsService
 
 logger = logging.getLogger(__name__)
 
 router = Router()
+router.callback_query.filter(CallbackPrefix("admin"))
+
+# Static keyboards are built once and reused by every callback
+_ADMIN_KB = admin_keyboard()
+_ADMIN_PRODUCTS_KB = admin_products_keyboard()
+_ADMIN_ORDERS_KB = admin_orders_keyboard()
+_BACK_KB = {
+    target: back_keyboard(target)
+    for target in ("admin", "admin:products", "admin:orders")
+}
+
+# Single numeric argument of an admin command, e.g. "/ban_user 12345"
+_ID_ARG_RE = re.compile(r"^/\w+(?:@\w+)?\s+(-?\d+)\s*$")
+
+# Message templates, filled from statistics schemas with str.format_map
+_USERS_SECTION_TEMPLATE = (
+    "• Total: {total_users}\n"
+    "• Active: {active_users}\n"
+    "• Trial users: {trial_users}\n"
+    "• Admins: {admin_users}\n"
+    "• New today: {new_users_today}\n\n"
+)
+_PRODUCTS_SECTION_TEMPLATE = (
+    "• Total: {total_products}\n"
+    "• Active: {active_products}\n"
+    "• Out of stock: {out_of_stock}\n"
+    "• Total sales: {total_sales}\n\n"
+)
+_ORDERS_SECTION_TEMPLATE = (
+    "• Total: {total_orders}\n"
+    "• Pending: {pending_orders}\n"
+    "• Completed: {completed_orders}\n"
+    "• Cancelled: {cancelled_orders}\n"
+    "• Revenue today: {revenue_today}\n"
+    "• Total revenue: {revenue_total}"
+)
+_STATS_TEMPLATE = (
+    "📊 <b>Bot Statistics</b>\n\n"
+    "👥 <b>Users:</b>\n"
+    "{users}"
+    "📦 <b>Products:</b>\n"
+    "{products}"
+    "🛒 <b>Orders:</b>\n"
+    "{orders}"
+)
+_USERS_TEMPLATE = (
+    "👥 <b>User Management</b>\n\n"
+    "📊 <b>Statistics:</b>\n"
+    "• Total users: {total_users}\n"
+    "• Active users: {active_users}\n"
+    "• Trial users: {trial_users}\n"
+    "• New today: {new_users_today}\n\n"
+    "🔧 <b>Actions:</b>\n"
+    "Use /find_user [telegram_id] to find specific user\n"
+    "Use /ban_user [telegram_id] to ban user\n"
+    "Use /unban_user [telegram_id] to unban user"
+)
+_PRODUCTS_TEMPLATE = (
+    "📦 <b>Product Management</b>\n\n"
+    "📊 <b>Statistics:</b>\n"
+    "• Total products: {total_products}\n"
+    "• Active products: {active_products}\n"
+    "• Out of stock: {out_of_stock}\n"
+    "• Total sales: {total_sales}\n\n"
+    "🔧 <b>Actions:</b>\n"
+    "• Load products from JSON file\n"
+    "• Export products to JSON file\n"
+    "• View product details\n\n"
+    "Use the buttons below to manage products:"
+)
+_ORDERS_TEMPLATE = (
+    "🛒 <b>Order Management</b>\n\n"
+    "📊 <b>Statistics:</b>\n"
+    "• Total orders: {total_orders}\n"
+    "• Pending: {pending_orders}\n"
+    "• Completed: {completed_orders}\n"
+    "• Cancelled: {cancelled_orders}\n"
+    "• Revenue today: {revenue_today}\n"
+    "• Total revenue: {revenue_total}\n\n"
+    "🔧 <b>Actions:</b>\n"
+    "• Clean up expired orders\n"
+    "• View recent orders\n"
+    "• Export order data"
+)
+
+
+# Settings are immutable at runtime, so the settings page is rendered once
+_SETTINGS_TEXT = (
+    f"⚙️ <b>Bot Settings</b>\n\n"
+    f"🌍 Environment: {settings.environment}\n"
+    f"💎 Trial enabled: {'✅' if settings.trial_enabled else '❌'}\n"
+    f"📅 Trial duration: {settings.trial_duration_days} days\n"
+    f"👥 Referral enabled: {'✅' if settings.referral_enabled else '❌'}\n"
+    f"🎁 Referral reward: {settings.referral_reward_days} days\n"
+    f"⭐ Telegram Stars: {'✅' if settings.telegram_stars_enabled else '❌'}\n"
+    f"💰 Cryptomus: {'✅' if settings.cryptomus_enabled else '❌'}\n"
+    f"💵 Default currency: {settings.default_currency}\n\n"
+    f"Settings can be changed in the configuration file."
+)
 
 
 @router.message(Command("admin"))
@@ -34,8 +148,8 @@ async def admin_callback(callback: CallbackQuery, is_admin: bool) -> None:
         await callback.answer("❌ You don't have admin permissions.", show_alert=True)
         return
     
-    await show_admin_panel(callback.message, edit=True)
-    await callback.answer()
+    # Edit and answer are independent requests, so send them together
+    await asyncio.gather(show_admin_panel(callback.message, edit=True), callback.answer())
 
 
 async def show_admin_panel(message: Message, edit: bool = False) -> None:
@@ -46,7 +160,7 @@ async def show_admin_panel(message: Message, edit: bool = False) -> None:
         f"Use the buttons below to manage the bot:"
     )
     
-    keyboard = admin_keyboard()
+    keyboard = _ADMIN_KB
     
     if edit:
         await message.edit_text(text, reply_markup=keyboard, parse_mode=ParseMode.HTML)
@@ -62,36 +176,22 @@ async def admin_stats_callback(callback: CallbackQuery, is_admin: bool) -> None:
         return
     
     try:
-        # Get statistics from all services
-        user_stats = await UserService.get_user_stats()
-        product_stats = await ProductService.get_product_stats()
-        order_stats = await OrderService.get_order_stats()
+        # All dashboard counters come from a single query
+        stats = await cached(
+            ADMIN_STATS_KEY, settings.stats_cache_ttl,
+            StatsService.get_combined_stats, AdminStats
+        )
+        users_text = _USERS_SECTION_TEMPLATE.format_map(stats.users.__dict__)
+        products_text = _PRODUCTS_SECTION_TEMPLATE.format_map(stats.products.__dict__)
+        orders_text = _ORDERS_SECTION_TEMPLATE.format_map(stats.orders.__dict__)
         
-        text = (
-            f"📊 <b>Bot Statistics</b>\n\n"
-            f"👥 <b>Users:</b>\n"
-            f"• Total: {user_stats.total_users}\n"
-            f"• Active: {user_stats.active_users}\n" 
-            f"• Trial users: {user_stats.trial_users}\n"
-            f"• Admins: {user_stats.admin_users}\n"
-            f"• New today: {user_stats.new_users_today}\n\n"
-            f"📦 <b>Products:</b>\n"
-            f"• Total: {product_stats.total_products}\n"
-            f"• Active: {product_stats.active_products}\n"
-            f"• Out of stock: {product_stats.out_of_stock}\n"
-            f"• Total sales: {product_stats.total_sales}\n\n"
-            f"🛒 <b>Orders:</b>\n"
-            f"• Total: {order_stats.total_orders}\n"
-            f"• Pending: {order_stats.pending_orders}\n"
-            f"• Completed: {order_stats.completed_orders}\n"
-            f"• Cancelled: {order_stats.cancelled_orders}\n"
-            f"• Revenue today: {order_stats.revenue_today}\n"
-            f"• Total revenue: {order_stats.revenue_total}"
+        text = _STATS_TEMPLATE.format(
+            users=users_text, products=products_text, orders=orders_text
         )
         
         await callback.message.edit_text(
             text,
-            reply_markup=back_keyboard("admin"),
+            reply_markup=_BACK_KB["admin"],
             parse_mode=ParseMode.HTML
         )
         await callback.answer()
@@ -109,24 +209,15 @@ async def admin_users_callback(callback: CallbackQuery, is_admin: bool) -> None:
         return
     
     try:
-        user_stats = await UserService.get_user_stats()
-        
-        text = (
-            f"👥 <b>User Management</b>\n\n"
-            f"📊 <b>Statistics:</b>\n"
-            f"• Total users: {user_stats.total_users}\n"
-            f"• Active users: {user_stats.active_users}\n"
-            f"• Trial users: {user_stats.trial_users}\n"
-            f"• New today: {user_stats.new_users_today}\n\n"
-            f"🔧 <b>Actions:</b>\n"
-            f"Use /find_user [telegram_id] to find specific user\n"
-            f"Use /ban_user [telegram_id] to ban user\n"
-            f"Use /unban_user [telegram_id] to unban user"
+        user_stats = await cached(
+            USER_STATS_KEY, settings.stats_cache_ttl, UserService.get_user_stats, UserStats
         )
         
+        text = _USERS_TEMPLATE.format_map(user_stats.__dict__)
+        
         await callback.message.edit_text(
             text,
-            reply_markup=back_keyboard("admin"),
+            reply_markup=_BACK_KB["admin"],
             parse_mode=ParseMode.HTML
         )
         await callback.answer()
@@ -144,30 +235,16 @@ async def admin_products_callback(callback: CallbackQuery, is_admin: bool) -> No
         return
     
     try:
-        product_stats = await ProductService.get_product_stats()
-        
-        text = (
-            f"📦 <b>Product Management</b>\n\n"
-            f"📊 <b>Statistics:</b>\n"
-            f"• Total products: {product_stats.total_products}\n"
-            f"• Active products: {product_stats.active_products}\n"
-            f"• Out of stock: {product_stats.out_of_stock}\n"
-            f"• Total sales: {product_stats.total_sales}\n\n"
-            f"🔧 <b>Actions:</b>\n"
-            f"• Load products from JSON file\n"
-            f"• Export products to JSON file\n"
-            f"• View product details\n\n"
-            f"Use the buttons below to manage products:"
+        product_stats = await cached(
+            PRODUCT_STATS_KEY, settings.stats_cache_ttl,
+            ProductService.get_product_stats, ProductStats
         )
         
-        from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📥 Load from JSON", callback_data="admin:load_products")],
-            [InlineKeyboardButton(text="📤 Export to JSON", callback_data="admin:export_products")],
-            [InlineKeyboardButton(text="🔙 Back", callback_data="admin")],
-        ])
+        text = _PRODUCTS_TEMPLATE.format_map(product_stats.__dict__)
         
-        await callback.message.edit_text(text, reply_markup=keyboard, parse_mode=ParseMode.HTML)
+        await callback.message.edit_text(
+            text, reply_markup=_ADMIN_PRODUCTS_KB, parse_mode=ParseMode.HTML
+        )
         await callback.answer()
         
     except Exception as e:
@@ -183,31 +260,15 @@ async def admin_orders_callback(callback: CallbackQuery, is_admin: bool) -> None
         return
     
     try:
-        order_stats = await OrderService.get_order_stats()
-        
-        text = (
-            f"🛒 <b>Order Management</b>\n\n"
-            f"📊 <b>Statistics:</b>\n"
-            f"• Total orders: {order_stats.total_orders}\n"
-            f"• Pending: {order_stats.pending_orders}\n"
-            f"• Completed: {order_stats.completed_orders}\n"
-            f"• Cancelled: {order_stats.cancelled_orders}\n"
-            f"• Revenue today: {order_stats.revenue_today}\n"
-            f"• Total revenue: {order_stats.revenue_total}\n\n"
-            f"🔧 <b>Actions:</b>\n"
-            f"• Clean up expired orders\n"
-            f"• View recent orders\n"
-            f"• Export order data"
+        order_stats = await cached(
+            ORDER_STATS_KEY, settings.stats_cache_ttl, OrderService.get_order_stats, OrderStats
         )
         
-        from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="🧹 Clean Expired", callback_data="admin:cleanup_orders")],
-            [InlineKeyboardButton(text="📋 Recent Orders", callback_data="admin:recent_orders")],
-            [InlineKeyboardButton(text="🔙 Back", callback_data="admin")],
-        ])
+        text = _ORDERS_TEMPLATE.format_map(order_stats.__dict__)
         
-        await callback.message.edit_text(text, reply_markup=keyboard, parse_mode=ParseMode.HTML)
+        await callback.message.edit_text(
+            text, reply_markup=_ADMIN_ORDERS_KB, parse_mode=ParseMode.HTML
+        )
         await callback.answer()
         
     except Exception as e:
@@ -229,7 +290,7 @@ async def admin_load_products_callback(callback: CallbackQuery, is_admin: bool)
         
         await callback.message.edit_text(
             text,
-            reply_markup=back_keyboard("admin:products"),
+            reply_markup=_BACK_KB["admin:products"],
             parse_mode=ParseMode.HTML
         )
         await callback.answer(f"Loaded {loaded_count} products!")
@@ -258,7 +319,7 @@ async def admin_export_products_callback(callback: CallbackQuery, is_admin: bool
         
         await callback.message.edit_text(
             text,
-            reply_markup=back_keyboard("admin:products"),
+            reply_markup=_BACK_KB["admin:products"],
             parse_mode=ParseMode.HTML
         )
         
@@ -281,7 +342,7 @@ async def admin_cleanup_orders_callback(callback: CallbackQuery, is_admin: bool)
         
         await callback.message.edit_text(
             text,
-            reply_markup=back_keyboard("admin:orders"),
+            reply_markup=_BACK_KB["admin:orders"],
             parse_mode=ParseMode.HTML
         )
         await callback.answer(f"Cleaned {expired_count} expired orders!")
@@ -309,7 +370,7 @@ async def admin_broadcast_callback(callback: CallbackQuery, is_admin: bool) -> N
     
     await callback.message.edit_text(
         text,
-        reply_markup=back_keyboard("admin"),
+        reply_markup=_BACK_KB["admin"],
         parse_mode=ParseMode.HTML
     )
     await callback.answer()
@@ -322,24 +383,9 @@ async def admin_settings_callback(callback: CallbackQuery, is_admin: bool) -> No
         await callback.answer("❌ Access denied.", show_alert=True)
         return
     
-    from app.config import settings
-    
-    text = (
-        f"⚙️ <b>Bot Settings</b>\n\n"
-        f"🌍 Environment: {settings.environment}\n"
-        f"💎 Trial enabled: {'✅' if settings.trial_enabled else '❌'}\n"
-        f"📅 Trial duration: {settings.trial_duration_days} days\n"
-        f"👥 Referral enabled: {'✅' if settings.referral_enabled else '❌'}\n"
-        f"🎁 Referral reward: {settings.referral_reward_days} days\n"
-        f"⭐ Telegram Stars: {'✅' if settings.telegram_stars_enabled else '❌'}\n"
-        f"💰 Cryptomus: {'✅' if settings.cryptomus_enabled else '❌'}\n"
-        f"💵 Default currency: {settings.default_currency}\n\n"
-        f"Settings can be changed in the configuration file."
-    )
-    
     await callback.message.edit_text(
-        text,
-        reply_markup=back_keyboard("admin"),
+        _SETTINGS_TEXT,
+        reply_markup=_BACK_KB["admin"],
         parse_mode=ParseMode.HTML
     )
     await callback.answer()
@@ -354,12 +400,12 @@ async def find_user_command(message: Message, is_admin: bool) -> None:
         return
     
     try:
-        args = message.text.split()
-        if len(args) != 2:
+        match = _ID_ARG_RE.match(message.text or "")
+        if not match:
             await message.answer("Usage: /find_user [telegram_id]")
             return
         
-        telegram_id = int(args[1])
+        telegram_id = int(match.group(1))
         user = await UserService.get_by_telegram_id(telegram_id)
         
         if not user:
@@ -370,7 +416,7 @@ async def find_user_command(message: Message, is_admin: bool) -> None:
             f"👤 <b>User Information</b>\n\n"
             f"🆔 ID: <code>{user.telegram_id}</code>\n"
             f"👤 Name: {user.display_name}\n"
-            f"📅 Joined: {user.created_at.strftime('%Y-%m-%d')}\n"
+            f"📅 Joined: {user.joined_fmt}\n"
             f"📱 Last activity: {user.last_activity.strftime('%Y-%m-%d %H:%M') if user.last_activity else 'Never'}\n"
             f"🟢 Active: {'✅' if user.is_active else '❌'}\n"
             f"🚫 Banned: {'✅' if user.is_banned else '❌'}\n"
@@ -381,8 +427,6 @@ async def find_user_command(message: Message, is_admin: bool) -> None:
         
         await message.answer(text)
         
-    except ValueError:
-        await message.answer("❌ Invalid telegram ID.")
     except Exception as e:
         logger.error(f"Error finding user: {e}")
         await message.answer("❌ Error finding user.")
@@ -396,27 +440,20 @@ async def ban_user_command(message: Message, is_admin: bool) -> None:
         return
     
     try:
-        args = message.text.split()
-        if len(args) != 2:
+        match = _ID_ARG_RE.match(message.text or "")
+        if not match:
             await message.answer("Usage: /ban_user [telegram_id]")
             return
         
-        telegram_id = int(args[1])
-        user = await UserService.get_by_telegram_id(telegram_id)
+        telegram_id = int(match.group(1))
+        user_id = await UserService.set_banned_by_telegram_id(telegram_id, banned=True)
         
-        if not user:
+        if user_id is None:
             await message.answer(f"❌ User {telegram_id} not found.")
             return
         
-        success = await UserService.ban_user(user.id, ban=True)
-        
-        if success:
-            await message.answer(f"✅ User {telegram_id} has been banned.")
-        else:
-            await message.answer(f"❌ Failed to ban user {telegram_id}.")
+        await message.answer(f"✅ User {telegram_id} has been banned.")
             
-    except ValueError:
-        await message.answer("❌ Invalid telegram ID.")
     except Exception as e:
         logger.error(f"Error banning user: {e}")
         await message.answer("❌ Error banning user.")
@@ -430,27 +467,20 @@ async def unban_user_command(message: Message, is_admin: bool) -> None:
         return
     
     try:
-        args = message.text.split()
-        if len(args) != 2:
+        match = _ID_ARG_RE.match(message.text or "")
+        if not match:
             await message.answer("Usage: /unban_user [telegram_id]")
             return
         
-        telegram_id = int(args[1])
-        user = await UserService.get_by_telegram_id(telegram_id)
+        telegram_id = int(match.group(1))
+        user_id = await UserService.set_banned_by_telegram_id(telegram_id, banned=False)
         
-        if not user:
+        if user_id is None:
             await message.answer(f"❌ User {telegram_id} not found.")
             return
         
-        success = await UserService.ban_user(user.id, ban=False)
-        
-        if success:
-            await message.answer(f"✅ User {telegram_id} has been unbanned.")
-        else:
-            await message.answer(f"❌ Failed to unban user {telegram_id}.")
+        await message.answer(f"✅ User {telegram_id} has been unbanned.")
             
-    except ValueError:
-        await message.answer("❌ Invalid telegram ID.")
     except Exception as e:
         logger.error(f"Error unbanning user: {e}")
         await message.answer("❌ Error unbanning user.")
\ No newline at end of file
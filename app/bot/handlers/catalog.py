@@ -6,53 +6,62 @@ from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.enums import ParseMode
 
+from app.bot.callbacks import (
+    BuyCB, BuyStarsCB, CallbackPrefix, CategoryCB, ProductCB, ProductsPageCB
+)
 from app.bot.keyboards import (
-    catalog_keyboard, products_keyboard, product_detail_keyboard,
-    payment_keyboard, back_keyboard
+    PAGE_SIZE, catalog_keyboard, products_keyboard, product_detail_keyboard,
+    payment_keyboard, back_keyboard, get_category_emoji
 )
 from app.services.product_service import ProductService
 from app.services.order_service import OrderService
-from app.schemas.order import OrderCreate
+from app.utils.helpers import fire_and_forget, parse_page_cursor
 
 logger = logging.getLogger(__name__)
 
 router = Router()
+router.callback_query.filter(
+    CallbackPrefix("catalog", "featured", CategoryCB, ProductsPageCB, ProductCB, BuyCB, BuyStarsCB)
+)
+
+# Static texts and keyboards are built once and reused by every callback
+_CATALOG_TEXT = (
+    "🛍️ <b>Product Catalog</b>\n\n"
+    "Choose a category to browse our digital products:\n"
+    "💎 High-quality digital goods\n"
+    "⚡ Instant delivery\n"
+    "🔒 Secure transactions"
+)
+_BACK_TO_CATALOG = back_keyboard("catalog")
+_BACK_TO_MAIN = back_keyboard("main_menu")
 
 
 @router.callback_query(F.data == "catalog")
 async def catalog_callback(callback: CallbackQuery) -> None:
     """Handle catalog callback."""
     await show_catalog(callback.message, edit=True)
-    await callback.answer()
+    fire_and_forget(callback.answer())
 
 
 async def show_catalog(message: Message, edit: bool = False) -> None:
     """Show product catalog."""
     try:
         # Get available categories
-        categories = await ProductService.get_categories()
-        
-        text = (
-            f"🛍️ <b>Product Catalog</b>\n\n"
-            f"Choose a category to browse our digital products:\n"
-            f"💎 High-quality digital goods\n"
-            f"⚡ Instant delivery\n"
-            f"🔒 Secure transactions"
-        )
+        categories = await ProductService.get_catalog_categories()
         
         keyboard = catalog_keyboard(categories)
         
         if edit and message:
-            await message.edit_text(text, reply_markup=keyboard, parse_mode=ParseMode.HTML)
+            await message.edit_text(_CATALOG_TEXT, reply_markup=keyboard, parse_mode=ParseMode.HTML)
         else:
-            await message.answer(text, reply_markup=keyboard, parse_mode=ParseMode.HTML)
+            await message.answer(_CATALOG_TEXT, reply_markup=keyboard, parse_mode=ParseMode.HTML)
             
     except Exception as e:
-        logger.error(f"Error showing catalog: {e}")
+        logger.error("Error showing catalog: %s", e)
         error_text = "❌ Failed to load catalog. Please try again."
         
         if edit and message:
-            await message.edit_text(error_text, reply_markup=back_keyboard("main_menu"))
+            await message.edit_text(error_text, reply_markup=_BACK_TO_MAIN)
         else:
             await message.answer(error_text)
 
@@ -61,25 +70,16 @@ async def show_catalog(message: Message, edit: bool = False) -> None:
 async def featured_callback(callback: CallbackQuery) -> None:
     """Handle featured products callback."""
     try:
-        products = await ProductService.get_featured_products()
+        products_data = await ProductService.get_featured_catalog()
         
-        if not products:
+        if not products_data:
             await callback.message.edit_text(
                 "📦 No featured products available at the moment.",
-                reply_markup=back_keyboard("catalog")
+                reply_markup=_BACK_TO_CATALOG
             )
-            await callback.answer()
+            fire_and_forget(callback.answer())
             return
         
-        # Convert to dict format for keyboard
-        products_data = []
-        for product in products:
-            products_data.append({
-                'id': product.id,
-                'name': product.name,
-                'formatted_price': product.formatted_price
-            })
-        
         text = f"⭐ <b>Featured Products</b>\n\nOur most popular items:"
         
         await callback.message.edit_text(
@@ -87,168 +87,133 @@ async def featured_callback(callback: CallbackQuery) -> None:
             reply_markup=products_keyboard(products_data, "featured"),
             parse_mode=ParseMode.HTML
         )
-        await callback.answer()
+        fire_and_forget(callback.answer())
         
     except Exception as e:
-        logger.error(f"Error showing featured products: {e}")
+        logger.error("Error showing featured products: %s", e)
         await callback.answer("❌ Failed to load featured products.")
 
 
-@router.callback_query(F.data.startswith("category:"))
-async def category_callback(callback: CallbackQuery) -> None:
+@router.callback_query(CategoryCB.filter())
+async def category_callback(callback: CallbackQuery, callback_data: CategoryCB) -> None:
     """Handle category selection callback."""
     try:
-        category = callback.data.split(":", 1)[1]
-        await show_category_products(callback, category)
+        await show_category_products(callback, callback_data.name)
         
     except Exception as e:
-        logger.error(f"Error showing category products: {e}")
+        logger.error("Error showing category products: %s", e)
         await callback.answer("❌ Failed to load products.")
 
 
-@router.callback_query(F.data.startswith("products:"))
-async def products_page_callback(callback: CallbackQuery) -> None:
+@router.callback_query(ProductsPageCB.filter())
+async def products_page_callback(callback: CallbackQuery, callback_data: ProductsPageCB) -> None:
     """Handle products pagination callback."""
     try:
-        _, category, page_str = callback.data.split(":")
-        page = int(page_str)
-        await show_category_products(callback, category, page)
+        await show_category_products(callback, callback_data.category, callback_data.cursor)
         
     except Exception as e:
-        logger.error(f"Error showing products page: {e}")
+        logger.error("Error showing products page: %s", e)
         await callback.answer("❌ Failed to load products.")
 
 
-async def show_category_products(callback: CallbackQuery, category: str, page: int = 0) -> None:
-    """Show products in a category."""
-    products = await ProductService.get_available_products(category=category)
+async def show_category_products(callback: CallbackQuery, category: str, cursor: str = "") -> None:
+    """Show a page of products in a category."""
+    after_id, before_id = parse_page_cursor(cursor)
+    page = await ProductService.get_category_page(
+        category, after_id=after_id, before_id=before_id, limit=PAGE_SIZE
+    )
+    products_data = page['products']
     
-    if not products:
+    if not products_data:
         await callback.message.edit_text(
             f"📦 No products available in {category.title()} category.",
-            reply_markup=back_keyboard("catalog")
+            reply_markup=_BACK_TO_CATALOG
         )
-        await callback.answer()
+        fire_and_forget(callback.answer())
         return
     
-    # Convert to dict format
-    products_data = []
-    for product in products:
-        products_data.append({
-            'id': product.id,
-            'name': product.name,
-            'formatted_price': product.formatted_price
-        })
-    
-    emoji = {
-        'software': '💻',
-        'gaming': '🎮', 
-        'subscription': '📺',
-        'digital': '💎',
-        'education': '📚'
-    }.get(category, '📦')
+    emoji = get_category_emoji(category)
     
     text = f"{emoji} <b>{category.title()} Products</b>\n\nSelect a product to view details:"
     
     await callback.message.edit_text(
         text,
-        reply_markup=products_keyboard(products_data, category, page),
+        reply_markup=products_keyboard(
+            products_data, category, page['has_prev'], page['has_next']
+        ),
         parse_mode=ParseMode.HTML
     )
-    await callback.answer()
+    fire_and_forget(callback.answer())
 
 
-@router.callback_query(F.data.startswith("product:"))
-async def product_detail_callback(callback: CallbackQuery) -> None:
+@router.callback_query(ProductCB.filter())
+async def product_detail_callback(callback: CallbackQuery, callback_data: ProductCB) -> None:
     """Handle product detail callback."""
     try:
-        product_id = int(callback.data.split(":", 1)[1])
-        product = await ProductService.get_by_id(product_id)
+        product = await ProductService.get_by_id(callback_data.id)
         
         if not product:
             await callback.answer("❌ Product not found.", show_alert=True)
             return
         
-        # Build product description
-        description_parts = [
-            f"💎 <b>{product.name}</b>\n",
-            f"💰 Price: <b>{product.formatted_price}</b>",
-            f"📦 Category: {product.category.title()}",
-        ]
-        
-        if product.description:
-            description_parts.append(f"\n📝 {product.description}")
-        
-        if product.duration_days:
-            if product.duration_days == 0:
-                description_parts.append("⏰ Duration: Permanent")
-            else:
-                description_parts.append(f"⏰ Duration: {product.duration_days} days")
-        
-        # Stock info
-        if product.stock_count is not None:
-            description_parts.append(f"📊 Stock: {product.stock_count} available")
-        else:
-            description_parts.append("📊 Stock: Unlimited")
-        
-        text = "\n".join(description_parts)
+        # Build product description in one expression
+        text = (
+            f"💎 <b>{product.name}</b>\n\n"
+            f"💰 Price: <b>{product.formatted_price}</b>\n"
+            f"📦 Category: {product.category.title()}"
+            + (f"\n\n📝 {product.description}" if product.description else "")
+            + (f"\n⏰ Duration: {product.duration_days} days" if product.duration_days else "")
+            + (
+                f"\n📊 Stock: {product.stock_count} available"
+                if product.stock_count is not None
+                else "\n📊 Stock: Unlimited"
+            )
+        )
         
         await callback.message.edit_text(
             text,
             reply_markup=product_detail_keyboard(product.id, product.is_available),
             parse_mode=ParseMode.HTML
         )
-        await callback.answer()
+        fire_and_forget(callback.answer())
         
     except Exception as e:
-        logger.error(f"Error showing product detail: {e}")
+        logger.error("Error showing product detail: %s", e)
         await callback.answer("❌ Failed to load product details.")
 
 
-@router.callback_query(F.data.startswith("buy:"))
-async def buy_product_callback(callback: CallbackQuery, db_user: Any) -> None:
+@router.callback_query(BuyCB.filter())
+async def buy_product_callback(callback: CallbackQuery, callback_data: BuyCB, db_user: Any) -> None:
     """Handle buy product callback."""
     try:
-        product_id = int(callback.data.split(":", 1)[1])
-        await create_order(callback, db_user, product_id, "cryptomus")
+        await create_order(callback, db_user, callback_data.id, "cryptomus")
         
     except Exception as e:
-        logger.error(f"Error creating order: {e}")
+        logger.error("Error creating order: %s", e, exc_info=True)
         await callback.answer("❌ Failed to create order.")
 
 
-@router.callback_query(F.data.startswith("buy_stars:"))
-async def buy_stars_callback(callback: CallbackQuery, db_user: Any) -> None:
+@router.callback_query(BuyStarsCB.filter())
+async def buy_stars_callback(callback: CallbackQuery, callback_data: BuyStarsCB, db_user: Any) -> None:
     """Handle buy with stars callback."""
     try:
-        product_id = int(callback.data.split(":", 1)[1])
-        await create_order(callback, db_user, product_id, "telegram_stars")
+        await create_order(callback, db_user, callback_data.id, "telegram_stars")
         
     except Exception as e:
-        logger.error(f"Error creating stars order: {e}")
+        logger.error("Error creating stars order: %s", e, exc_info=True)
         await callback.answer("❌ Failed to create order.")
 
 
 async def create_order(callback: CallbackQuery, db_user: Any, product_id: int, gateway: str) -> None:
     """Create order for product."""
-    # Check if product is available
-    product = await ProductService.get_by_id(product_id)
-    if not product or not product.is_available:
+    # Availability check and order creation share one transaction
+    created = await OrderService.create_order_for_product(db_user.id, product_id, gateway)
+    
+    if not created:
         await callback.answer("❌ Product is not available.", show_alert=True)
         return
     
-    # Create order
-    order_data = OrderCreate(
-        product_id=product_id,
-        payment_gateway=gateway,
-        quantity=1
-    )
-    
-    order = await OrderService.create_order(db_user.id, order_data)
-    
-    if not order:
-        await callback.answer("❌ Failed to create order. Please try again.", show_alert=True)
-        return
+    order, product = created
     
     # Show payment options
     text = (
@@ -1,4 +1,5 @@
 """Order management handlers."""
+import asyncio
 import logging
 from typing import Any
 
@@ -7,29 +8,70 @@ from aiogram.types import Message, CallbackQuery, LabeledPrice, PreCheckoutQuery
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.enums import ParseMode
 
+from app.bot.callbacks import (
+    CallbackPrefix, CancelOrderCB, OrderCB, OrdersPageCB, PayCB, PayOrderCB
+)
 from app.bot.keyboards import (
-    orders_keyboard, order_detail_keyboard, payment_keyboard,
-    back_keyboard
+    PAGE_SIZE, orders_keyboard, order_detail_keyboard, payment_keyboard,
+    crypto_payment_keyboard, back_keyboard, get_status_emoji
 )
+from app.models.order import OrderStatus
 from app.services.order_service import OrderService
 from app.services.payment_service import PaymentService
 from app.services.notification_service import NotificationService
 from app.schemas.order import PaymentRequest
+from app.utils.helpers import fire_and_forget, parse_page_cursor
 
 logger = logging.getLogger(__name__)
 
 router = Router()
+router.callback_query.filter(
+    CallbackPrefix("my_orders", OrdersPageCB, OrderCB, PayOrderCB, PayCB, CancelOrderCB)
+)
+
+# Static texts and keyboards are built once and reused by every callback
+_BACK_TO_CATALOG = back_keyboard("catalog")
+_BACK_TO_MAIN = back_keyboard("main_menu")
+_NO_ORDERS_TEXT = (
+    "📦 <b>Your Orders</b>\n\n"
+    "You haven't made any orders yet.\n"
+    "Visit our catalog to start shopping!"
+)
+_ORDER_CANCELLED_TEMPLATE = (
+    "❌ <b>Order Cancelled</b>\n\n"
+    "Order <code>{order_number}</code> has been cancelled.\n"
+    "You can create a new order anytime from our catalog."
+)
 
 
 @router.callback_query(F.data == "my_orders")
 async def my_orders_callback(callback: CallbackQuery, db_user: Any) -> None:
     """Handle my orders callback."""
-    await show_user_orders(callback.message, db_user, edit=True)
-    await callback.answer()
+    # Edit and answer are independent requests, so send them together
+    await asyncio.gather(
+        show_user_orders(callback.message, db_user, edit=True),
+        callback.answer()
+    )
+
+
+@router.callback_query(OrdersPageCB.filter())
+async def orders_page_callback(
+    callback: CallbackQuery, callback_data: OrdersPageCB, db_user: Any
+) -> None:
+    """Handle orders pagination callback."""
+    await asyncio.gather(
+        show_user_orders(callback.message, db_user, edit=True, cursor=callback_data.cursor),
+        callback.answer()
+    )
 
 
-async def show_user_orders(message: Message, db_user: Any = None, edit: bool = False) -> None:
-    """Show user orders."""
+async def show_user_orders(
+    message: Message,
+    db_user: Any = None,
+    edit: bool = False,
+    cursor: str = ""
+) -> None:
+    """Show a page of user orders."""
     try:
         if not db_user:
             # This shouldn't happen with middleware, but just in case
@@ -40,15 +82,15 @@ async def show_user_orders(message: Message, db_user: Any = None, edit: bool = F
                 await message.answer(text)
             return
         
-        orders = await OrderService.get_user_orders(db_user.id, limit=20)
+        after_id, before_id = parse_page_cursor(cursor)
+        page = await OrderService.get_user_orders_page(
+            db_user.id, after_id=after_id, before_id=before_id, limit=PAGE_SIZE
+        )
+        orders = page['orders']
         
         if not orders:
-            text = (
-                "📦 <b>Your Orders</b>\n\n"
-                "You haven't made any orders yet.\n"
-                "Visit our catalog to start shopping!"
-            )
-            keyboard = back_keyboard("catalog")
+            text = _NO_ORDERS_TEXT
+            keyboard = _BACK_TO_CATALOG
         else:
             # Convert to dict format
             orders_data = []
@@ -60,8 +102,8 @@ async def show_user_orders(message: Message, db_user: Any = None, edit: bool = F
                     'formatted_total': order.formatted_total
                 })
             
-            text = f"📦 <b>Your Orders</b>\n\nTotal orders: {len(orders)}"
-            keyboard = orders_keyboard(orders_data)
+            text = "📦 <b>Your Orders</b>\n\nSelect an order to view details:"
+            keyboard = orders_keyboard(orders_data, page['has_prev'], page['has_next'])
         
         if edit:
             await message.edit_text(text, reply_markup=keyboard, parse_mode=ParseMode.HTML)
@@ -69,58 +111,50 @@ async def show_user_orders(message: Message, db_user: Any = None, edit: bool = F
             await message.answer(text, reply_markup=keyboard, parse_mode=ParseMode.HTML)
             
     except Exception as e:
-        logger.error(f"Error showing user orders: {e}")
+        logger.error("Error showing user orders: %s", e)
         error_text = "❌ Failed to load orders. Please try again."
         
         if edit:
-            await message.edit_text(error_text, reply_markup=back_keyboard("main_menu"))
+            await message.edit_text(error_text, reply_markup=_BACK_TO_MAIN)
         else:
             await message.answer(error_text)
 
 
-@router.callback_query(F.data.startswith("order:"))
-async def order_detail_callback(callback: CallbackQuery, db_user: Any) -> None:
+@router.callback_query(OrderCB.filter())
+async def order_detail_callback(callback: CallbackQuery, callback_data: OrderCB, db_user: Any) -> None:
     """Handle order detail callback."""
     try:
-        order_id = int(callback.data.split(":", 1)[1])
-        order = await OrderService.get_by_id(order_id)
+        order = await OrderService.get_by_id_with_product(callback_data.id)
         
         if not order or order.user_id != db_user.id:
             await callback.answer("❌ Order not found.", show_alert=True)
             return
         
-        # Get product info
-        from app.services.product_service import ProductService
-        product = await ProductService.get_by_id(order.product_id)
+        product = order.product
         
         # Format order details
-        status_emoji = {
-            'pending': '⏳',
-            'processing': '🔄',
-            'completed': '✅',
-            'cancelled': '❌',
-            'failed': '💥'
-        }.get(order.status, '❓')
-        
-        text_parts = [
-            f"📦 <b>Order Details</b>\n",
-            f"🔢 Order: <code>{order.order_number}</code>",
-            f"📦 Product: {product.name if product else 'Unknown'}",
-            f"💰 Amount: {order.formatted_total}",
-            f"📊 Status: {status_emoji} {order.status.title()}",
-            f"📅 Created: {order.created_at.strftime('%Y-%m-%d %H:%M')}",
-        ]
-        
-        if order.expires_at and order.is_pending:
-            text_parts.append(f"⏰ Expires: {order.expires_at.strftime('%Y-%m-%d %H:%M')}")
-        
-        if order.delivered_at:
-            text_parts.append(f"✅ Delivered: {order.delivered_at.strftime('%Y-%m-%d %H:%M')}")
-        
-        if order.delivery_message:
-            text_parts.append(f"\n📝 <b>Delivery Info:</b>\n{order.delivery_message}")
-        
-        text = "\n".join(text_parts)
+        status_emoji = get_status_emoji(order.status)
+        
+        text = (
+            f"📦 <b>Order Details</b>\n\n"
+            f"🔢 Order: <code>{order.order_number}</code>\n"
+            f"📦 Product: {product.name if product else 'Unknown'}\n"
+            f"💰 Amount: {order.formatted_total}\n"
+            f"📊 Status: {status_emoji} {order.status.title()}\n"
+            f"📅 Created: {order.formatted_created_at}"
+            + (
+                f"\n⏰ Expires: {order.formatted_expires_at}"
+                if order.expires_at and order.is_pending else ""
+            )
+            + (
+                f"\n✅ Delivered: {order.formatted_delivered_at}"
+                if order.delivered_at else ""
+            )
+            + (
+                f"\n\n📝 <b>Delivery Info:</b>\n{order.delivery_message}"
+                if order.delivery_message else ""
+            )
+        )
         
         await callback.message.edit_text(
             text,
@@ -130,18 +164,17 @@ async def order_detail_callback(callback: CallbackQuery, db_user: Any) -> None:
         await callback.answer()
         
     except Exception as e:
-        logger.error(f"Error showing order detail: {e}")
+        logger.error("Error showing order detail: %s", e)
         await callback.answer("❌ Failed to load order details.")
 
 
-@router.callback_query(F.data.startswith("pay_order:"))
-async def pay_order_callback(callback: CallbackQuery, db_user: Any) -> None:
+@router.callback_query(PayOrderCB.filter())
+async def pay_order_callback(callback: CallbackQuery, callback_data: PayOrderCB, db_user: Any) -> None:
     """Handle pay order callback."""
     try:
-        order_id = int(callback.data.split(":", 1)[1])
-        order = await OrderService.get_by_id(order_id)
+        order = await OrderService.get_by_id(callback_data.id)
         
-        if not order or order.user_id != db_user.id or not order.is_pending:
+        if not order or order.user_id != db_user.id or not order.is_awaiting_payment:
             await callback.answer("❌ Invalid order for payment.", show_alert=True)
             return
         
@@ -160,24 +193,21 @@ async def pay_order_callback(callback: CallbackQuery, db_user: Any) -> None:
         await callback.answer()
         
     except Exception as e:
-        logger.error(f"Error showing payment options: {e}")
+        logger.error("Error showing payment options: %s", e)
         await callback.answer("❌ Failed to load payment options.")
 
 
-@router.callback_query(F.data.startswith("pay:stars:"))
-async def pay_stars_callback(callback: CallbackQuery, db_user: Any) -> None:
+@router.callback_query(PayCB.filter(F.kind == "stars"))
+async def pay_stars_callback(callback: CallbackQuery, callback_data: PayCB, db_user: Any) -> None:
     """Handle Telegram Stars payment."""
     try:
-        order_id = int(callback.data.split(":", 2)[2])
-        order = await OrderService.get_by_id(order_id)
+        order = await OrderService.get_by_id_with_product(callback_data.id)
         
         if not order or order.user_id != db_user.id or not order.is_pending:
             await callback.answer("❌ Invalid order for payment.", show_alert=True)
             return
         
-        # Get product for invoice
-        from app.services.product_service import ProductService
-        product = await ProductService.get_by_id(order.product_id)
+        product = order.product
         
         if not product:
             await callback.answer("❌ Product not found.", show_alert=True)
@@ -199,18 +229,17 @@ async def pay_stars_callback(callback: CallbackQuery, db_user: Any) -> None:
         await callback.answer("📋 Invoice sent! Please complete the payment.")
         
     except Exception as e:
-        logger.error(f"Error creating Stars payment: {e}")
+        logger.error("Error creating Stars payment: %s", e, exc_info=True)
         await callback.answer("❌ Failed to create payment.")
 
 
-@router.callback_query(F.data.startswith("pay:crypto:"))
-async def pay_crypto_callback(callback: CallbackQuery, db_user: Any) -> None:
+@router.callback_query(PayCB.filter(F.kind == "crypto"))
+async def pay_crypto_callback(callback: CallbackQuery, callback_data: PayCB, db_user: Any) -> None:
     """Handle cryptocurrency payment."""
     try:
-        order_id = int(callback.data.split(":", 2)[2])
-        order = await OrderService.get_by_id(order_id)
+        order = await OrderService.get_by_id(callback_data.id)
         
-        if not order or order.user_id != db_user.id or not order.is_pending:
+        if not order or order.user_id != db_user.id or not order.is_awaiting_payment:
             await callback.answer("❌ Invalid order for payment.", show_alert=True)
             return
         
@@ -233,26 +262,23 @@ async def pay_crypto_callback(callback: CallbackQuery, db_user: Any) -> None:
             f"Click the button below to complete payment:"
         )
         
-        from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
-        keyboard = InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="💳 Pay Now", url=payment_response.payment_url)],
-            [InlineKeyboardButton(text="❌ Cancel", callback_data=f"cancel_order:{order.id}")],
-        ])
+        keyboard = crypto_payment_keyboard(payment_response.payment_url, order.id)
         
         await callback.message.edit_text(text, reply_markup=keyboard, parse_mode=ParseMode.HTML)
         await callback.answer("Payment link created!")
         
     except Exception as e:
-        logger.error(f"Error creating crypto payment: {e}")
+        logger.error("Error creating crypto payment: %s", e, exc_info=True)
         await callback.answer("❌ Failed to create payment.")
 
 
-@router.callback_query(F.data.startswith("cancel_order:"))
-async def cancel_order_callback(callback: CallbackQuery, db_user: Any) -> None:
+@router.callback_query(CancelOrderCB.filter())
+async def cancel_order_callback(
+    callback: CallbackQuery, callback_data: CancelOrderCB, db_user: Any
+) -> None:
     """Handle cancel order callback."""
     try:
-        order_id = int(callback.data.split(":", 1)[1])
-        order = await OrderService.get_by_id(order_id)
+        order = await OrderService.get_by_id(callback_data.id)
         
         if not order or order.user_id != db_user.id:
             await callback.answer("❌ Order not found.", show_alert=True)
@@ -262,26 +288,20 @@ async def cancel_order_callback(callback: CallbackQuery, db_user: Any) -> None:
             await callback.answer("❌ Only pending orders can be cancelled.", show_alert=True)
             return
         
-        success = await OrderService.cancel_order(order.id, "Cancelled by user")
+        success = await OrderService.cancel_order(order.id, "Cancelled by user", pending_only=True)
         
         if success:
-            text = (
-                f"❌ <b>Order Cancelled</b>\n\n"
-                f"Order <code>{order.order_number}</code> has been cancelled.\n"
-                f"You can create a new order anytime from our catalog."
-            )
-            
             await callback.message.edit_text(
-                text,
-                reply_markup=back_keyboard("catalog"),
+                _ORDER_CANCELLED_TEMPLATE.format(order_number=order.order_number),
+                reply_markup=_BACK_TO_CATALOG,
                 parse_mode=ParseMode.HTML
             )
-            await callback.answer("Order cancelled successfully.")
+            fire_and_forget(callback.answer("Order cancelled successfully."))
         else:
             await callback.answer("❌ Failed to cancel order.", show_alert=True)
             
     except Exception as e:
-        logger.error(f"Error cancelling order: {e}")
+        logger.error("Error cancelling order: %s", e)
         await callback.answer("❌ Failed to cancel order.")
 
 
@@ -296,14 +316,15 @@ async def pre_checkout_handler(pre_checkout_query: PreCheckoutQuery) -> None:
             return
         
         order_id = int(payload.replace("order_", ""))
-        order = await OrderService.get_by_id(order_id)
+        # Only status and amount are needed; skip full order hydration
+        snapshot = await OrderService.get_checkout_snapshot(order_id)
         
-        if not order or not order.is_pending:
+        if not snapshot or snapshot[0] != OrderStatus.PENDING.value:
             await pre_checkout_query.answer(ok=False, error_message="Order not available")
             return
         
         # Check if order amount matches
-        expected_amount = int(order.total_price)
+        expected_amount = int(snapshot[1])
         if pre_checkout_query.total_amount != expected_amount:
             await pre_checkout_query.answer(ok=False, error_message="Amount mismatch")
             return
@@ -311,7 +332,7 @@ async def pre_checkout_handler(pre_checkout_query: PreCheckoutQuery) -> None:
         await pre_checkout_query.answer(ok=True)
         
     except Exception as e:
-        logger.error(f"Error in pre-checkout: {e}")
+        logger.error("Error in pre-checkout: %s", e, exc_info=True)
         await pre_checkout_query.answer(ok=False, error_message="Payment processing error")
 
 
@@ -323,21 +344,20 @@ async def successful_payment_handler(message: Message, db_user: Any) -> None:
         payload = payment.invoice_payload
         
         if not payload.startswith("order_"):
-            logger.error(f"Invalid payment payload: {payload}")
+            logger.error("Invalid payment payload: %s", payload)
             return
         
         order_id = int(payload.replace("order_", ""))
         order = await OrderService.get_by_id(order_id)
         
         if not order:
-            logger.error(f"Order not found for payment: {order_id}")
+            logger.error("Order not found for payment: %s", order_id)
             return
         
         # Complete the order
         success = await OrderService.complete_order(order.id)
         
         if success:
-            # Generate delivery message
             delivery_message = await OrderService.generate_delivery_message(order)
             
             if delivery_message:
@@ -350,9 +370,6 @@ async def successful_payment_handler(message: Message, db_user: Any) -> None:
                 )
             
             # Notify admins
-            from app.services.product_service import ProductService
-            product = await ProductService.get_by_id(order.product_id)
-            
             # This would need to be initialized with bot instance
             # notification_service = NotificationService(message.bot)
             # await notification_service.notify_order_completed(
@@ -367,7 +384,7 @@ async def successful_payment_handler(message: Message, db_user: Any) -> None:
             )
             
     except Exception as e:
-        logger.error(f"Error processing successful payment: {e}")
+        logger.error("Error processing successful payment: %s", e, exc_info=True)
         await message.answer(
             "❌ Payment processing error. Please contact support if you were charged."
         )
\ No newline at end of file
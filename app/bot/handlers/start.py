@@ -1,5 +1,7 @@
 """Start and main menu handlers."""
+import asyncio
 import logging
+from datetime import timedelta
 from typing import Dict, Any
 
 from aiogram import Router, F
@@ -8,13 +10,74 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.enums import ParseMode
 
-from app.bot.keyboards import main_menu_keyboard, profile_keyboard
+from app.bot.callbacks import CallbackPrefix
+from app.bot.handlers.catalog import show_catalog
+from app.bot.handlers.order import show_user_orders
+from app.bot.keyboards import back_keyboard, main_menu_keyboard, profile_keyboard
+from app.services.order_service import OrderService
 from app.services.user_service import UserService
 from app.config import settings
+from app.utils.helpers import utcnow
 
 logger = logging.getLogger(__name__)
 
 router = Router()
+router.callback_query.filter(
+    CallbackPrefix(
+        "main_menu", "profile", "activate_trial", "referral", "support", "profile_stats", "noop"
+    )
+)
+
+# Static texts and keyboards are built once and reused by every callback
+_MAIN_MENU_KB = main_menu_keyboard()
+_PROFILE_KB = profile_keyboard()
+_PROFILE_TRIAL_USED_KB = profile_keyboard(has_trial=True)
+_BACK_TO_MAIN = back_keyboard("main_menu")
+_BACK_TO_PROFILE = back_keyboard("profile")
+_SUPPORT_TEXT = (
+    "ℹ️ <b>Support & Information</b>\n\n"
+    "🆘 Need help? Contact our support team:\n"
+    "📧 Email: support@digitalstore.com\n"
+    "💬 Telegram: @support\n\n"
+    "📋 <b>How to use the bot:</b>\n"
+    "1️⃣ Browse the catalog\n"
+    "2️⃣ Select a product\n"
+    "3️⃣ Complete payment\n"
+    "4️⃣ Receive your digital product\n\n"
+    "💎 Don't forget to try our free trial!"
+)
+_HELP_TEXT = (
+    "🆘 <b>Help & Commands</b>\n\n"
+    "<b>Available commands:</b>\n"
+    "/start - Start the bot\n"
+    "/help - Show this help message\n"
+    "/catalog - Browse products\n"
+    "/profile - View your profile\n"
+    "/orders - View your orders\n\n"
+    "Use the inline buttons to navigate through the bot!"
+)
+_PROFILE_TEMPLATE = (
+    "👤 <b>Your Profile</b>\n\n"
+    "🆔 ID: <code>{telegram_id}</code>\n"
+    "👤 Name: {name}\n"
+    "📅 Joined: {joined}\n"
+    "💎 Trial: {trial}\n"
+    "👥 Referrals: {referrals}\n"
+    "🔗 Your referral code: <code>{referral_code}</code>"
+)
+_TRIAL_ACTIVATED_TEMPLATE = (
+    "🎉 <b>Trial Activated!</b>\n\n"
+    "✅ Your {days}-day free trial is now active!\n"
+    "🛍️ Browse our catalog and enjoy premium access.\n\n"
+    "Trial expires: {expires}"
+)
+# Only the greeting line of the welcome text depends on the user
+_WELCOME_TAIL = (
+    "🛍️ Browse our catalog of digital products\n"
+    "💎 Get free trial access\n"
+    "👥 Earn rewards through referrals\n\n"
+    "Choose an option from the menu below:"
+)
 
 
 @router.message(Command("start"))
@@ -22,17 +85,11 @@ async def start_command(message: Message, db_user: Any, state: FSMContext) -> No
     """Handle /start command."""
     await state.clear()
     
-    welcome_text = (
-        f"👋 Welcome to our Digital Store, {db_user.display_name}!\n\n"
-        f"🛍️ Browse our catalog of digital products\n"
-        f"💎 Get free trial access\n"
-        f"👥 Earn rewards through referrals\n\n"
-        f"Choose an option from the menu below:"
-    )
+    welcome_text = f"👋 Welcome to our Digital Store, {db_user.display_name}!\n\n" + _WELCOME_TAIL
     
     await message.answer(
         welcome_text,
-        reply_markup=main_menu_keyboard(),
+        reply_markup=_MAIN_MENU_KB,
         parse_mode=ParseMode.HTML
     )
 
@@ -48,17 +105,24 @@ async def main_menu_callback(callback: CallbackQuery, db_user: Any, state: FSMCo
         f"What would you like to do?"
     )
     
-    await callback.message.edit_text(
-        text,
-        reply_markup=main_menu_keyboard(),
-        parse_mode=ParseMode.HTML
+    # Edit and answer are independent requests, so send them together
+    await asyncio.gather(
+        callback.message.edit_text(text, reply_markup=_MAIN_MENU_KB, parse_mode=ParseMode.HTML),
+        callback.answer()
     )
-    await callback.answer()
 
 
 @router.callback_query(F.data == "profile")
 async def profile_callback(callback: CallbackQuery, db_user: Any) -> None:
     """Handle profile callback."""
+    await asyncio.gather(
+        show_profile(callback.message, db_user, edit=True),
+        callback.answer()
+    )
+
+
+async def show_profile(message: Message, db_user: Any, edit: bool = False) -> None:
+    """Show user profile."""
     # Get user statistics
     trial_info = ""
     if db_user.trial_used:
@@ -69,22 +133,21 @@ async def profile_callback(callback: CallbackQuery, db_user: Any) -> None:
     else:
         trial_info = "🟡 Available"
     
-    text = (
-        f"👤 <b>Your Profile</b>\n\n"
-        f"🆔 ID: <code>{db_user.telegram_id}</code>\n"
-        f"👤 Name: {db_user.display_name}\n"
-        f"📅 Joined: {db_user.created_at.strftime('%Y-%m-%d')}\n"
-        f"💎 Trial: {trial_info}\n"
-        f"👥 Referrals: {db_user.total_referred}\n"
-        f"🔗 Your referral code: <code>{db_user.referral_code}</code>"
+    text = _PROFILE_TEMPLATE.format(
+        telegram_id=db_user.telegram_id,
+        name=db_user.display_name,
+        joined=db_user.joined_fmt,
+        trial=trial_info,
+        referrals=db_user.total_referred,
+        referral_code=db_user.referral_code
     )
     
-    await callback.message.edit_text(
-        text,
-        reply_markup=profile_keyboard(has_trial=db_user.trial_used),
-        parse_mode=ParseMode.HTML
-    )
-    await callback.answer()
+    keyboard = _PROFILE_TRIAL_USED_KB if db_user.trial_used else _PROFILE_KB
+    
+    if edit:
+        await message.edit_text(text, reply_markup=keyboard, parse_mode=ParseMode.HTML)
+    else:
+        await message.answer(text, reply_markup=keyboard, parse_mode=ParseMode.HTML)
 
 
 @router.callback_query(F.data == "activate_trial")
@@ -98,22 +161,22 @@ async def activate_trial_callback(callback: CallbackQuery, db_user: Any) -> None
         await callback.answer("❌ Trial system is currently disabled.", show_alert=True)
         return
     
+    # Render the success text up front; it is only sent if activation succeeds
+    trial_end = utcnow() + timedelta(days=settings.trial_duration_days)
+    text = _TRIAL_ACTIVATED_TEMPLATE.format(
+        days=settings.trial_duration_days,
+        expires=trial_end.isoformat(sep=" ", timespec="minutes")[:16]
+    )
+    
     success = await UserService.activate_trial(db_user.id)
     
     if success:
-        text = (
-            f"🎉 <b>Trial Activated!</b>\n\n"
-            f"✅ Your {settings.trial_duration_days}-day free trial is now active!\n"
-            f"🛍️ Browse our catalog and enjoy premium access.\n\n"
-            f"Trial expires: {db_user.trial_end.strftime('%Y-%m-%d %H:%M') if db_user.trial_end else 'N/A'}"
+        await asyncio.gather(
+            callback.message.edit_text(
+                text, reply_markup=_PROFILE_TRIAL_USED_KB, parse_mode=ParseMode.HTML
+            ),
+            callback.answer("🎉 Trial activated successfully!")
         )
-        
-        await callback.message.edit_text(
-            text,
-            reply_markup=profile_keyboard(has_trial=True),
-            parse_mode=ParseMode.HTML
-        )
-        await callback.answer("🎉 Trial activated successfully!")
     else:
         await callback.answer("❌ Failed to activate trial. Please try again.", show_alert=True)
 
@@ -121,7 +184,8 @@ async def activate_trial_callback(callback: CallbackQuery, db_user: Any) -> None
 @router.callback_query(F.data == "referral")
 async def referral_callback(callback: CallbackQuery, db_user: Any) -> None:
     """Handle referral information."""
-    bot_info = await callback.bot.get_me()
+    # Bot.me() caches the bot user after the first call
+    bot_info = await callback.bot.me()
     referral_link = f"https://t.me/{bot_info.username}?start={db_user.referral_code}"
     
     text = (
@@ -134,52 +198,37 @@ async def referral_callback(callback: CallbackQuery, db_user: Any) -> None:
         f"💡 Share your link with friends to earn rewards when they make purchases!"
     )
     
-    await callback.message.edit_text(
-        text,
-        reply_markup=profile_keyboard(),
-        parse_mode=ParseMode.HTML
+    await asyncio.gather(
+        callback.message.edit_text(text, reply_markup=_PROFILE_KB, parse_mode=ParseMode.HTML),
+        callback.answer()
     )
-    await callback.answer()
 
 
 @router.callback_query(F.data == "support")
 async def support_callback(callback: CallbackQuery) -> None:
     """Handle support information."""
-    text = (
-        f"ℹ️ <b>Support & Information</b>\n\n"
-        f"🆘 Need help? Contact our support team:\n"
-        f"📧 Email: support@digitalstore.com\n"
-        f"💬 Telegram: @support\n\n"
-        f"📋 <b>How to use the bot:</b>\n"
-        f"1️⃣ Browse the catalog\n"
-        f"2️⃣ Select a product\n"
-        f"3️⃣ Complete payment\n"
-        f"4️⃣ Receive your digital product\n\n"
-        f"💎 Don't forget to try our free trial!"
-    )
-    
-    from app.bot.keyboards import back_keyboard
-    await callback.message.edit_text(
-        text,
-        reply_markup=back_keyboard("main_menu"),
-        parse_mode=ParseMode.HTML
+    await asyncio.gather(
+        callback.message.edit_text(
+            _SUPPORT_TEXT, reply_markup=_BACK_TO_MAIN, parse_mode=ParseMode.HTML
+        ),
+        callback.answer()
     )
-    await callback.answer()
 
 
 @router.callback_query(F.data == "profile_stats")
 async def profile_stats_callback(callback: CallbackQuery, db_user: Any) -> None:
     """Handle profile statistics callback."""
     try:
-        from app.services.order_service import OrderService
-        
-        # Get user order statistics
-        order_stats = await OrderService.get_user_order_stats(db_user.id)
+        # Answer the click right away while order statistics are aggregated
+        order_stats, _ = await asyncio.gather(
+            OrderService.get_user_order_stats(db_user.id),
+            callback.answer()
+        )
         
         text = (
             f"📊 <b>Your Statistics</b>\n\n"
             f"👤 <b>Account Info:</b>\n"
-            f"📅 Member since: {db_user.created_at.strftime('%Y-%m-%d')}\n"
+            f"📅 Member since: {db_user.joined_fmt}\n"
             f"🎯 Trial used: {'Yes' if db_user.trial_used else 'No'}\n"
             f"🔗 Referral code: <code>{db_user.referral_code}</code>\n"
             f"👥 Referrals: {db_user.total_referred}\n\n"
@@ -191,60 +240,43 @@ async def profile_stats_callback(callback: CallbackQuery, db_user: Any) -> None:
             f"🏆 Keep shopping to unlock more rewards!"
         )
         
-        from app.bot.keyboards import back_keyboard
         await callback.message.edit_text(
             text,
-            reply_markup=back_keyboard("profile"),
+            reply_markup=_BACK_TO_PROFILE,
             parse_mode=ParseMode.HTML
         )
-        await callback.answer()
         
     except Exception as e:
         logger.error(f"Failed to get user statistics: {e}")
-        await callback.answer("❌ Failed to load statistics. Please try again.", show_alert=True)
+        # The callback is already answered, so report the error in the message
+        await callback.message.edit_text(
+            "❌ Failed to load statistics. Please try again.",
+            reply_markup=_BACK_TO_PROFILE
+        )
 
 
 @router.message(Command("help"))
 async def help_command(message: Message) -> None:
     """Handle /help command."""
-    text = (
-        f"🆘 <b>Help & Commands</b>\n\n"
-        f"<b>Available commands:</b>\n"
-        f"/start - Start the bot\n"
-        f"/help - Show this help message\n"
-        f"/catalog - Browse products\n"
-        f"/profile - View your profile\n"
-        f"/orders - View your orders\n\n"
-        f"Use the inline buttons to navigate through the bot!"
-    )
-    
-    await message.answer(text, parse_mode=ParseMode.HTML)
+    await message.answer(_HELP_TEXT, parse_mode=ParseMode.HTML)
 
 
 @router.message(Command("catalog"))
 async def catalog_command(message: Message) -> None:
     """Handle /catalog command."""
-    from app.bot.handlers.catalog import show_catalog
     await show_catalog(message)
 
 
 @router.message(Command("profile"))
 async def profile_command(message: Message, db_user: Any) -> None:
     """Handle /profile command."""
-    await profile_callback(
-        type('CallbackQuery', (), {
-            'message': message,
-            'answer': lambda *args, **kwargs: None
-        })(),
-        db_user
-    )
+    await show_profile(message, db_user)
 
 
 @router.message(Command("orders"))
-async def orders_command(message: Message) -> None:
+async def orders_command(message: Message, db_user: Any) -> None:
     """Handle /orders command."""
-    from app.bot.handlers.order import show_user_orders
-    await show_user_orders(message)
+    await show_user_orders(message, db_user)
 
 
 @router.callback_query(F.data == "noop")
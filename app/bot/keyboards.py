@@ -1,20 +1,89 @@
 """Keyboard layouts for the bot."""
-from typing import List, Optional
+from functools import lru_cache
+from typing import Final, List, Optional, Tuple
 
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
 
+from app.bot.callbacks import (
+    BuyCB, BuyStarsCB, CancelOrderCB, CategoryCB, OrderCB, OrdersPageCB,
+    PayCB, PayOrderCB, ProductCB, ProductsPageCB
+)
+from app.bot.session import register_static_markup
+
+# Items per page in paginated lists
+PAGE_SIZE = 5
+
+_CATEGORY_EMOJI: Final[dict[str, str]] = {
+    "software": "💻",
+    "gaming": "🎮",
+    "subscription": "📺",
+    "digital": "💎",
+    "education": "📚",
+}
+
+_STATUS_EMOJI: Final[dict[str, str]] = {
+    "pending": "⏳",
+    "processing": "🔄",
+    "completed": "✅",
+    "cancelled": "❌",
+    "failed": "💥",
+    "refunded": "💸",
+}
+
+
+# Static keyboards are built once and shared by every caller
+_MAIN_MENU: Final = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🛍️ Catalog", callback_data="catalog")],
+    [InlineKeyboardButton(text="📦 My Orders", callback_data="my_orders")],
+    [InlineKeyboardButton(text="👤 Profile", callback_data="profile")],
+    [InlineKeyboardButton(text="💎 Try for Free", callback_data="trial")],
+    [InlineKeyboardButton(text="👥 Referral", callback_data="referral")],
+    [InlineKeyboardButton(text="ℹ️ Support", callback_data="support")],
+])
+
+_PROFILE_NO_TRIAL: Final = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="💎 Activate Trial", callback_data="activate_trial")],
+    [InlineKeyboardButton(text="📊 Statistics", callback_data="profile_stats")],
+    [InlineKeyboardButton(text="👥 My Referrals", callback_data="my_referrals")],
+    [InlineKeyboardButton(text="🔙 Back to Menu", callback_data="main_menu")],
+])
+
+_PROFILE_TRIAL: Final = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="📊 Statistics", callback_data="profile_stats")],
+    [InlineKeyboardButton(text="👥 My Referrals", callback_data="my_referrals")],
+    [InlineKeyboardButton(text="🔙 Back to Menu", callback_data="main_menu")],
+])
+
+_ADMIN: Final = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="📊 Statistics", callback_data="admin:stats")],
+    [InlineKeyboardButton(text="👥 Users", callback_data="admin:users")],
+    [InlineKeyboardButton(text="📦 Products", callback_data="admin:products")],
+    [InlineKeyboardButton(text="🛒 Orders", callback_data="admin:orders")],
+    [InlineKeyboardButton(text="📢 Broadcast", callback_data="admin:broadcast")],
+    [InlineKeyboardButton(text="⚙️ Settings", callback_data="admin:settings")],
+    [InlineKeyboardButton(text="🔙 Main Menu", callback_data="main_menu")],
+])
+
+_ADMIN_PRODUCTS: Final = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="📥 Load from JSON", callback_data="admin:load_products")],
+    [InlineKeyboardButton(text="📤 Export to JSON", callback_data="admin:export_products")],
+    [InlineKeyboardButton(text="🔙 Back", callback_data="admin")],
+])
+
+_ADMIN_ORDERS: Final = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🧹 Clean Expired", callback_data="admin:cleanup_orders")],
+    [InlineKeyboardButton(text="📋 Recent Orders", callback_data="admin:recent_orders")],
+    [InlineKeyboardButton(text="🔙 Back", callback_data="admin")],
+])
+
+register_static_markup(
+    _MAIN_MENU, _PROFILE_NO_TRIAL, _PROFILE_TRIAL, _ADMIN, _ADMIN_PRODUCTS, _ADMIN_ORDERS
+)
+
 
 def main_menu_keyboard() -> InlineKeyboardMarkup:
-    """Create main menu keyboard."""
-    buttons = [
-        [InlineKeyboardButton(text="🛍️ Catalog", callback_data="catalog")],
-        [InlineKeyboardButton(text="📦 My Orders", callback_data="my_orders")],
-        [InlineKeyboardButton(text="👤 Profile", callback_data="profile")],
-        [InlineKeyboardButton(text="💎 Try for Free", callback_data="trial")],
-        [InlineKeyboardButton(text="👥 Referral", callback_data="referral")],
-        [InlineKeyboardButton(text="ℹ️ Support", callback_data="support")],
-    ]
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
+    """Get main menu keyboard."""
+    return _MAIN_MENU
 
 
 def catalog_keyboard(categories: List[str]) -> InlineKeyboardMarkup:
@@ -30,7 +99,7 @@ def catalog_keyboard(categories: List[str]) -> InlineKeyboardMarkup:
                 emoji = get_category_emoji(category)
                 row.append(InlineKeyboardButton(
                     text=f"{emoji} {category.title()}",
-                    callback_data=f"category:{category}"
+                    callback_data=CategoryCB(name=category).pack()
                 ))
         buttons.append(row)
     
@@ -43,26 +112,51 @@ def catalog_keyboard(categories: List[str]) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
-def products_keyboard(products: List[dict], category: str, page: int = 0, per_page: int = 5) -> InlineKeyboardMarkup:
-    """Create products list keyboard."""
-    buttons = []
-    
+def products_keyboard(
+    products: List[dict],
+    category: str,
+    has_prev: bool = False,
+    has_next: bool = False
+) -> InlineKeyboardMarkup:
+    """Create products list keyboard for one page of products."""
+    entries = tuple(
+        (product['id'], product['name'], product['formatted_price']) for product in products
+    )
+    return _products_keyboard(entries, category, has_prev, has_next)
+
+
+# Keyed by page content, so changed names or prices simply miss the cache
+@lru_cache(maxsize=128)
+def _products_keyboard(
+    entries: Tuple[Tuple[int, str, str], ...],
+    category: str,
+    has_prev: bool,
+    has_next: bool
+) -> InlineKeyboardMarkup:
+    """Build products list keyboard from (id, name, formatted_price) entries."""
     # Add product buttons
-    start_idx = page * per_page
-    end_idx = min(start_idx + per_page, len(products))
-    
-    for product in products[start_idx:end_idx]:
-        buttons.append([InlineKeyboardButton(
-            text=f"💎 {product['name']} - {product['formatted_price']}",
-            callback_data=f"product:{product['id']}"
-        )])
+    buttons = [
+        [InlineKeyboardButton(
+            text=f"💎 {name} - {formatted_price}",
+            callback_data=ProductCB(id=product_id).pack()
+        )]
+        for product_id, name, formatted_price in entries
+    ]
     
-    # Add pagination if needed
+    # Add pagination if needed; cursors are the first/last ids on the page
     nav_buttons = []
-    if page > 0:
-        nav_buttons.append(InlineKeyboardButton(text="⬅️ Prev", callback_data=f"products:{category}:{page-1}"))
-    if end_idx < len(products):
-        nav_buttons.append(InlineKeyboardButton(text="➡️ Next", callback_data=f"products:{category}:{page+1}"))
+    if has_prev and entries:
+        nav_buttons.append(InlineKeyboardButton(
+            text="⬅️ Prev", callback_data=ProductsPageCB(
+                category=category, cursor=f"<{entries[0][0]}"
+            ).pack()
+        ))
+    if has_next and entries:
+        nav_buttons.append(InlineKeyboardButton(
+            text="➡️ Next", callback_data=ProductsPageCB(
+                category=category, cursor=f">{entries[-1][0]}"
+            ).pack()
+        ))
     
     if nav_buttons:
         buttons.append(nav_buttons)
@@ -79,8 +173,8 @@ def product_detail_keyboard(product_id: int, is_available: bool = True) -> Inlin
     
     if is_available:
         buttons.extend([
-            [InlineKeyboardButton(text="💰 Buy Now", callback_data=f"buy:{product_id}")],
-            [InlineKeyboardButton(text="⭐ Buy with Stars", callback_data=f"buy_stars:{product_id}")],
+            [InlineKeyboardButton(text="💰 Buy Now", callback_data=BuyCB(id=product_id).pack())],
+            [InlineKeyboardButton(text="⭐ Buy with Stars", callback_data=BuyStarsCB(id=product_id).pack())],
         ])
     else:
         buttons.append([InlineKeyboardButton(text="❌ Out of Stock", callback_data="noop")])
@@ -93,34 +187,47 @@ def product_detail_keyboard(product_id: int, is_available: bool = True) -> Inlin
 def payment_keyboard(order_id: int) -> InlineKeyboardMarkup:
     """Create payment options keyboard."""
     buttons = [
-        [InlineKeyboardButton(text="⭐ Pay with Telegram Stars", callback_data=f"pay:stars:{order_id}")],
-        [InlineKeyboardButton(text="💰 Pay with Crypto", callback_data=f"pay:crypto:{order_id}")],
-        [InlineKeyboardButton(text="❌ Cancel Order", callback_data=f"cancel_order:{order_id}")],
+        [InlineKeyboardButton(text="⭐ Pay with Telegram Stars", callback_data=PayCB(kind="stars", id=order_id).pack())],
+        [InlineKeyboardButton(text="💰 Pay with Crypto", callback_data=PayCB(kind="crypto", id=order_id).pack())],
+        [InlineKeyboardButton(text="❌ Cancel Order", callback_data=CancelOrderCB(id=order_id).pack())],
     ]
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
-def orders_keyboard(orders: List[dict], page: int = 0, per_page: int = 5) -> InlineKeyboardMarkup:
-    """Create orders list keyboard."""
-    buttons = []
-    
+def crypto_payment_keyboard(payment_url: str, order_id: int) -> InlineKeyboardMarkup:
+    """Create keyboard with crypto payment link."""
+    buttons = [
+        [InlineKeyboardButton(text="💳 Pay Now", url=payment_url)],
+        [InlineKeyboardButton(text="❌ Cancel", callback_data=CancelOrderCB(id=order_id).pack())],
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def orders_keyboard(
+    orders: List[dict],
+    has_prev: bool = False,
+    has_next: bool = False
+) -> InlineKeyboardMarkup:
+    """Create orders list keyboard for one page of orders."""
     # Add order buttons
-    start_idx = page * per_page
-    end_idx = min(start_idx + per_page, len(orders))
-    
-    for order in orders[start_idx:end_idx]:
-        status_emoji = get_status_emoji(order['status'])
-        buttons.append([InlineKeyboardButton(
-            text=f"{status_emoji} {order['order_number']} - {order['formatted_total']}",
-            callback_data=f"order:{order['id']}"
-        )])
+    buttons = [
+        [InlineKeyboardButton(
+            text=f"{get_status_emoji(order['status'])} {order['order_number']} - {order['formatted_total']}",
+            callback_data=OrderCB(id=order['id']).pack()
+        )]
+        for order in orders
+    ]
     
-    # Add pagination if needed
+    # Add pagination if needed; cursors are the first/last ids on the page
     nav_buttons = []
-    if page > 0:
-        nav_buttons.append(InlineKeyboardButton(text="⬅️ Prev", callback_data=f"orders:{page-1}"))
-    if end_idx < len(orders):
-        nav_buttons.append(InlineKeyboardButton(text="➡️ Next", callback_data=f"orders:{page+1}"))
+    if has_prev and orders:
+        nav_buttons.append(InlineKeyboardButton(
+            text="⬅️ Prev", callback_data=OrdersPageCB(cursor=f"<{orders[0]['id']}").pack()
+        ))
+    if has_next and orders:
+        nav_buttons.append(InlineKeyboardButton(
+            text="➡️ Next", callback_data=OrdersPageCB(cursor=f">{orders[-1]['id']}").pack()
+        ))
     
     if nav_buttons:
         buttons.append(nav_buttons)
@@ -135,11 +242,16 @@ def order_detail_keyboard(order_id: int, status: str) -> InlineKeyboardMarkup:
     """Create order detail keyboard."""
     buttons = []
     
+    if status in ("pending", "processing"):
+        buttons.append(
+            [InlineKeyboardButton(text="💳 Pay Now", callback_data=PayOrderCB(id=order_id).pack())]
+        )
+    
+    # A processing order has a live invoice, so it can no longer be cancelled by the user
     if status == "pending":
-        buttons.extend([
-            [InlineKeyboardButton(text="💳 Pay Now", callback_data=f"pay_order:{order_id}")],
-            [InlineKeyboardButton(text="❌ Cancel", callback_data=f"cancel_order:{order_id}")],
-        ])
+        buttons.append(
+            [InlineKeyboardButton(text="❌ Cancel", callback_data=CancelOrderCB(id=order_id).pack())]
+        )
     
     buttons.append([InlineKeyboardButton(text="🔙 Back to Orders", callback_data="my_orders")])
     
@@ -147,32 +259,23 @@ def order_detail_keyboard(order_id: int, status: str) -> InlineKeyboardMarkup:
 
 
 def profile_keyboard(has_trial: bool = False) -> InlineKeyboardMarkup:
-    """Create profile keyboard."""
-    buttons = [
-        [InlineKeyboardButton(text="📊 Statistics", callback_data="profile_stats")],
-        [InlineKeyboardButton(text="👥 My Referrals", callback_data="my_referrals")],
-    ]
-    
-    if not has_trial:
-        buttons.insert(0, [InlineKeyboardButton(text="💎 Activate Trial", callback_data="activate_trial")])
-    
-    buttons.append([InlineKeyboardButton(text="🔙 Back to Menu", callback_data="main_menu")])
-    
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
+    """Get profile keyboard."""
+    return _PROFILE_TRIAL if has_trial else _PROFILE_NO_TRIAL
 
 
 def admin_keyboard() -> InlineKeyboardMarkup:
-    """Create admin panel keyboard."""
-    buttons = [
-        [InlineKeyboardButton(text="📊 Statistics", callback_data="admin:stats")],
-        [InlineKeyboardButton(text="👥 Users", callback_data="admin:users")],
-        [InlineKeyboardButton(text="📦 Products", callback_data="admin:products")],
-        [InlineKeyboardButton(text="🛒 Orders", callback_data="admin:orders")],
-        [InlineKeyboardButton(text="📢 Broadcast", callback_data="admin:broadcast")],
-        [InlineKeyboardButton(text="⚙️ Settings", callback_data="admin:settings")],
-        [InlineKeyboardButton(text="🔙 Main Menu", callback_data="main_menu")],
-    ]
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
+    """Get admin panel keyboard."""
+    return _ADMIN
+
+
+def admin_products_keyboard() -> InlineKeyboardMarkup:
+    """Get admin product management keyboard."""
+    return _ADMIN_PRODUCTS
+
+
+def admin_orders_keyboard() -> InlineKeyboardMarkup:
+    """Get admin order management keyboard."""
+    return _ADMIN_ORDERS
 
 
 def confirmation_keyboard(action: str, item_id: Optional[int] = None) -> InlineKeyboardMarkup:
@@ -193,33 +296,21 @@ def confirmation_keyboard(action: str, item_id: Optional[int] = None) -> InlineK
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@lru_cache(maxsize=64)
 def back_keyboard(callback_data: str) -> InlineKeyboardMarkup:
     """Create simple back button keyboard."""
-    return InlineKeyboardMarkup(inline_keyboard=[
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="🔙 Back", callback_data=callback_data)]
     ])
+    register_static_markup(keyboard)
+    return keyboard
 
 
 def get_category_emoji(category: str) -> str:
     """Get emoji for product category."""
-    emojis = {
-        "software": "💻",
-        "gaming": "🎮",
-        "subscription": "📺",
-        "digital": "💎",
-        "education": "📚",
-    }
-    return emojis.get(category.lower(), "📦")
+    return _CATEGORY_EMOJI.get(category.lower(), "📦")
 
 
 def get_status_emoji(status: str) -> str:
     """Get emoji for order status."""
-    emojis = {
-        "pending": "⏳",
-        "processing": "🔄",
-        "completed": "✅",
-        "cancelled": "❌",
-        "failed": "💥",
-        "refunded": "💸",
-    }
-    return emojis.get(status.lower(), "❓")
\ No newline at end of file
+    return _STATUS_EMOJI.get(status.lower(), "❓")
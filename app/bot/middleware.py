@@ -1,19 +1,27 @@
 """Bot middleware."""
 import logging
-from typing import Any, Awaitable, Callable, Dict
+from typing import Any, Awaitable, Callable, Dict, Optional
 
 from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject, User as TgUser
+from aiogram.types import Message, TelegramObject, Update, User as TgUser
 
+from app.models.user import User
 from app.services.user_service import UserService
 from app.schemas.user import UserCreate
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Configured admin IDs never change at runtime
+_ADMIN_IDS = settings.admin_id_set
 
-class UserMiddleware(BaseMiddleware):
-    """Middleware to handle user registration and activity tracking."""
+
+class CompositeMiddleware(BaseMiddleware):
+    """Middleware for logging, user registration, activity tracking and admin checks.
+    
+    These steps used to be separate middlewares; running them in one pass
+    saves a coroutine frame per step on every update.
+    """
     
     async def __call__(
         self,
@@ -22,33 +30,21 @@ class UserMiddleware(BaseMiddleware):
         data: Dict[str, Any]
     ) -> Any:
         """Process the event."""
-        user: TgUser = data.get("event_from_user")
+        user: Optional[TgUser] = data.get("event_from_user")
+        
+        # Registered on updates; message text and callback data live on the inner event
+        inner = event.event if isinstance(event, Update) else event
+        
+        if user:
+            self._log_event(user, inner)
         
+        db_user = None
         if user and not user.is_bot:
-            # Get or create user
-            db_user = await UserService.get_by_telegram_id(user.id)
+            # Known banned users are dropped before any database access
+            if UserService.is_banned(user.id):
+                return
             
-            if not db_user:
-                # Create new user
-                user_data = UserCreate(
-                    telegram_id=user.id,
-                    username=user.username,
-                    first_name=user.first_name,
-                    last_name=user.last_name,
-                    language_code=user.language_code
-                )
-                
-                # Check for referral code in start command
-                referrer_code = None
-                if hasattr(event, 'text') and event.text:
-                    if event.text.startswith('/start '):
-                        referrer_code = event.text.split(' ', 1)[1]
-                
-                db_user = await UserService.create_user(user_data, referrer_code)
-                logger.info(f"New user registered: {user.id}")
-            else:
-                # Update user activity
-                await UserService.update_activity(user.id)
+            db_user = await self._get_db_user(user, inner)
             
             # Check if user is banned
             if db_user.is_banned:
@@ -58,50 +54,53 @@ class UserMiddleware(BaseMiddleware):
             # Add user to handler data
             data["db_user"] = db_user
         
+        # Check if user is admin
+        data["is_admin"] = bool(db_user) and (
+            db_user.is_admin or db_user.telegram_id in _ADMIN_IDS
+        )
+        
         return await handler(event, data)
-
-
-class AdminMiddleware(BaseMiddleware):
-    """Middleware to check admin permissions."""
     
-    async def __call__(
-        self,
-        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
-        event: TelegramObject,
-        data: Dict[str, Any]
-    ) -> Any:
-        """Process the event."""
-        db_user = data.get("db_user")
+    @staticmethod
+    def _log_event(user: TgUser, event: TelegramObject) -> None:
+        """Log user interaction."""
+        # Skip attribute lookups entirely when INFO is filtered out
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        
+        if hasattr(event, 'text') and event.text:
+            logger.info("User %s (%s): %s", user.id, user.username, event.text)
+        elif hasattr(event, 'data') and event.data:
+            logger.info("User %s (%s) callback: %s", user.id, user.username, event.data)
+    
+    @staticmethod
+    async def _get_db_user(user: TgUser, event: TelegramObject) -> User:
+        """Get or register user and track its activity."""
+        # Cached users only need their activity recorded
+        db_user = UserService.get_cached_user(user.id)
         
-        # Check if user is admin
         if db_user:
-            is_admin = (
-                db_user.is_admin or 
-                db_user.telegram_id in settings.admin_ids or
-                db_user.telegram_id == settings.developer_id
-            )
-            data["is_admin"] = is_admin
-        else:
-            data["is_admin"] = False
+            # Flushed in batches by the scheduler
+            UserService.record_activity(user.id)
+            return db_user
         
-        return await handler(event, data)
-
-
-class LoggingMiddleware(BaseMiddleware):
-    """Middleware for logging user interactions."""
-    
-    async def __call__(
-        self,
-        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
-        event: TelegramObject,
-        data: Dict[str, Any]
-    ) -> Any:
-        """Process the event."""
-        user: TgUser = data.get("event_from_user")
+        user_data = UserCreate(
+            telegram_id=user.id,
+            username=user.username,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            language_code=user.language_code
+        )
         
-        if user and hasattr(event, 'text') and event.text:
-            logger.info(f"User {user.id} ({user.username}): {event.text}")
-        elif user and hasattr(event, 'data') and event.data:
-            logger.info(f"User {user.id} ({user.username}) callback: {event.data}")
+        # Check for referral code in start command
+        referrer_code = None
+        if isinstance(event, Message) and event.text:
+            command, sep, argument = event.text.partition(' ')
+            if command == '/start' and sep:
+                referrer_code = argument
         
-        return await handler(event, data)
\ No newline at end of file
+        # Create the user or refresh its activity in one statement
+        db_user, created = await UserService.touch_user(user_data, referrer_code)
+        if created:
+            logger.info(f"New user registered: {user.id}")
+        return db_user
@@ -0,0 +1,55 @@
+"""HTTP session for the Telegram Bot API."""
+from typing import Any, Dict, Optional
+
+import orjson
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.types import InlineKeyboardMarkup
+
+# Keyboards that never change, by id(); holding them keeps the ids stable
+_static_markups: Dict[int, InlineKeyboardMarkup] = {}
+
+
+def _json_dumps(obj) -> str:
+    """Serialize request payload with orjson."""
+    return orjson.dumps(obj).decode()
+
+
+def register_static_markup(*markups: InlineKeyboardMarkup) -> None:
+    """Mark keyboards as immutable so their JSON is serialized only once."""
+    for markup in markups:
+        _static_markups[id(markup)] = markup
+
+
+class BotSession(AiohttpSession):
+    """Aiohttp session that reuses the JSON of static keyboards."""
+    
+    def __init__(self, **kwargs: Any):
+        super().__init__(json_loads=orjson.loads, json_dumps=_json_dumps, **kwargs)
+        self._markup_json: Dict[int, str] = {}
+    
+    def prepare_value(
+        self,
+        value: Any,
+        bot: Bot,
+        files: Dict[str, Any],
+        _dumps_json: bool = True
+    ) -> Any:
+        """Prepare request value, serving static keyboards from cache."""
+        if not (_dumps_json and isinstance(value, InlineKeyboardMarkup)):
+            return super().prepare_value(value, bot, files, _dumps_json=_dumps_json)
+        
+        key = id(value)
+        if _static_markups.get(key) is not value:
+            return super().prepare_value(value, bot, files, _dumps_json=_dumps_json)
+        
+        cached: Optional[str] = self._markup_json.get(key)
+        if cached is None:
+            cached = super().prepare_value(value, bot, files, _dumps_json=_dumps_json)
+            self._markup_json[key] = cached
+        return cached
+
+
+def create_session() -> AiohttpSession:
+    """Create aiohttp session that encodes and decodes JSON with orjson."""
+    return BotSession()
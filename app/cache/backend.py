@@ -0,0 +1,119 @@
+"""Redis cache backend with in-memory fallback."""
+import logging
+import time
+from typing import Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.cache.memory import TTLCache
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before trying Redis again after a failure
+RETRY_INTERVAL = 30.0
+
+_redis: Optional[Redis] = None
+_redis_down_until = 0.0
+_fallback = TTLCache(maxsize=4096)
+
+
+def _get_redis() -> Optional[Redis]:
+    """Get Redis client, or None while Redis is marked unavailable."""
+    global _redis
+    
+    if _redis_down_until > time.monotonic():
+        return None
+    
+    if _redis is None:
+        _redis = Redis.from_url(
+            settings.redis_url,
+            socket_connect_timeout=1,
+            socket_timeout=1
+        )
+    return _redis
+
+
+def _mark_down(error: Exception) -> None:
+    """Switch to in-memory fallback for a while."""
+    global _redis_down_until
+    
+    if _redis_down_until <= time.monotonic():
+        logger.warning(f"Redis unavailable, using in-memory cache: {error}")
+    _redis_down_until = time.monotonic() + RETRY_INTERVAL
+
+
+async def cache_get(key: str) -> Optional[bytes]:
+    """Get raw value by key."""
+    client = _get_redis()
+    if client is not None:
+        try:
+            return await client.get(key)
+        except (RedisError, OSError) as e:
+            _mark_down(e)
+    
+    return _fallback.get(key)
+
+
+async def cache_set(key: str, value: bytes, ttl: int) -> None:
+    """Set raw value with TTL in seconds."""
+    client = _get_redis()
+    if client is not None:
+        try:
+            await client.set(key, value, ex=ttl)
+            return
+        except (RedisError, OSError) as e:
+            _mark_down(e)
+    
+    _fallback.set(key, value, ttl)
+
+
+async def cache_add(key: str, value: bytes, ttl: int) -> bool:
+    """Set value only if key does not exist; return True if it was set."""
+    client = _get_redis()
+    if client is not None:
+        try:
+            return bool(await client.set(key, value, ex=ttl, nx=True))
+        except (RedisError, OSError) as e:
+            _mark_down(e)
+    
+    return _fallback.add(key, value, ttl)
+
+
+async def cache_delete(*keys: str) -> None:
+    """Delete keys."""
+    if not keys:
+        return
+    
+    _fallback.delete(*keys)
+    
+    client = _get_redis()
+    if client is not None:
+        try:
+            await client.delete(*keys)
+        except (RedisError, OSError) as e:
+            _mark_down(e)
+
+
+async def cache_delete_prefix(prefix: str) -> None:
+    """Delete all keys starting with prefix."""
+    _fallback.delete_prefix(prefix)
+    
+    client = _get_redis()
+    if client is not None:
+        try:
+            keys = [key async for key in client.scan_iter(match=f"{prefix}*", count=500)]
+            if keys:
+                await client.delete(*keys)
+        except (RedisError, OSError) as e:
+            _mark_down(e)
+
+
+async def close_cache() -> None:
+    """Close Redis connection."""
+    global _redis
+    
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
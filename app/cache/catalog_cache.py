@@ -0,0 +1,37 @@
+"""Cache for product catalog listings shown in the bot."""
+import logging
+from typing import Any, Awaitable, Callable
+
+import orjson
+
+from app.cache.backend import cache_delete_prefix, cache_get, cache_set
+
+logger = logging.getLogger(__name__)
+
+CATALOG_PREFIX = "catalog:"
+CATEGORIES_KEY = f"{CATALOG_PREFIX}categories"
+FEATURED_KEY = f"{CATALOG_PREFIX}featured"
+
+
+def category_key(category: str, page: str) -> str:
+    """Get cache key for a page of available products in a category."""
+    return f"{CATALOG_PREFIX}cat:{category}:{page}"
+
+
+async def cached_catalog(key: str, ttl: int, coro_factory: Callable[[], Awaitable[Any]]) -> Any:
+    """Return cached JSON-serializable value or compute, store and return it."""
+    raw = await cache_get(key)
+    if raw is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError as e:
+            logger.warning(f"Invalid cached value for {key}: {e}")
+    
+    value = await coro_factory()
+    await cache_set(key, orjson.dumps(value), ttl)
+    return value
+
+
+async def invalidate_catalog() -> None:
+    """Drop all cached catalog listings."""
+    await cache_delete_prefix(CATALOG_PREFIX)
@@ -0,0 +1,62 @@
+"""In-process TTL cache."""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """Small LRU cache with per-entry expiration."""
+    
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get value by key, dropping it if expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._data.pop(key, None)
+            return default
+        
+        self._data.move_to_end(key)
+        return value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value with the given (or default) TTL."""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else float("inf")
+        
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def add(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> bool:
+        """Store value only if key is not present. Returns True if stored."""
+        if self.get(key) is not None:
+            return False
+        self.set(key, value, ttl)
+        return True
+    
+    def delete(self, *keys: Hashable) -> None:
+        """Delete keys from cache."""
+        for key in keys:
+            self._data.pop(key, None)
+    
+    def delete_prefix(self, prefix: str) -> None:
+        """Delete all string keys starting with prefix."""
+        for key in [k for k in self._data if isinstance(k, str) and k.startswith(prefix)]:
+            self._data.pop(key, None)
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
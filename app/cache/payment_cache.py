@@ -0,0 +1,13 @@
+"""Cache for payment links created with payment gateways."""
+from app.cache.backend import cache_delete
+from app.models.order import PaymentGateway
+
+
+def payment_key(gateway: str, order_id: int) -> str:
+    """Get cache key for an order's payment response."""
+    return f"pay:{gateway}:{order_id}"
+
+
+async def invalidate_payment(order_id: int) -> None:
+    """Drop cached payment responses of an order."""
+    await cache_delete(*(payment_key(gateway.value, order_id) for gateway in PaymentGateway))
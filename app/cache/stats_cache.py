@@ -0,0 +1,65 @@
+"""Short-lived cache for admin statistics."""
+import logging
+from typing import Awaitable, Callable, Type, TypeVar
+
+from pydantic import BaseModel
+
+from app.cache.backend import cache_delete, cache_get, cache_set
+
+logger = logging.getLogger(__name__)
+
+USER_STATS_KEY = "stats:users"
+PRODUCT_STATS_KEY = "stats:products"
+ORDER_STATS_KEY = "stats:orders"
+ADMIN_STATS_KEY = "stats:admin"
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+async def cached(
+    key: str,
+    ttl: int,
+    coro_factory: Callable[[], Awaitable[ModelT]],
+    model: Type[ModelT]
+) -> ModelT:
+    """Return cached model or compute, store and return it."""
+    raw = await cache_get(key)
+    if raw is not None:
+        try:
+            return model.model_validate_json(raw)
+        except ValueError as e:
+            logger.warning(f"Invalid cached value for {key}: {e}")
+    
+    value = await coro_factory()
+    await cache_set(key, value.model_dump_json(), ttl)
+    return value
+
+
+async def cached_json(
+    key: str,
+    ttl: int,
+    coro_factory: Callable[[], Awaitable[BaseModel]]
+) -> bytes:
+    """Return cached JSON bytes or compute, store and return them."""
+    raw = await cache_get(key)
+    if raw is not None:
+        return raw
+    
+    value = (await coro_factory()).model_dump_json().encode()
+    await cache_set(key, value, ttl)
+    return value
+
+
+async def invalidate_user_stats() -> None:
+    """Drop cached user statistics."""
+    await cache_delete(USER_STATS_KEY, ADMIN_STATS_KEY)
+
+
+async def invalidate_product_stats() -> None:
+    """Drop cached product statistics."""
+    await cache_delete(PRODUCT_STATS_KEY, ADMIN_STATS_KEY)
+
+
+async def invalidate_order_stats() -> None:
+    """Drop cached order statistics."""
+    await cache_delete(ORDER_STATS_KEY, ADMIN_STATS_KEY)
@@ -1,5 +1,6 @@
 """Application configuration management."""
 from enum import Enum
+from functools import cached_property, lru_cache
 from pathlib import Path
 from typing import Optional
 
@@ -53,12 +54,24 @@ class Settings(BaseSettings):
         default="sqlite+aiosqlite:///./data/store.db",
         description="Database connection URL"
     )
+    db_pool_size: int = Field(default=20, description="Database connection pool size")
+    db_max_overflow: int = Field(default=40, description="Extra connections above pool size")
+    db_pool_timeout: int = Field(default=30, description="Seconds to wait for a connection")
+    db_pool_recycle: int = Field(default=3600, description="Connection recycle time in seconds")
+    db_command_timeout: int = Field(default=60, description="Statement timeout in seconds (asyncpg)")
+    db_warm_size: int = Field(default=5, description="Connections opened at startup")
     
     # Redis
     redis_url: str = Field(
         default="redis://localhost:6379/0",
         description="Redis connection URL"
     )
+    stats_cache_ttl: int = Field(default=30, description="Statistics cache TTL in seconds")
+    catalog_cache_ttl: int = Field(default=300, description="Product catalog cache TTL in seconds")
+    user_cache_ttl: int = Field(default=60, description="Bot user cache TTL in seconds")
+    activity_flush_interval: int = Field(
+        default=30, description="Seconds between user activity flushes"
+    )
     
     # Payment Gateways
     telegram_stars_enabled: bool = Field(default=True, description="Enable Telegram Stars")
@@ -92,11 +105,28 @@ class Settings(BaseSettings):
             return f"https://{self.bot_domain}{self.bot_webhook_path}"
         return None
 
+    @cached_property
+    def admin_id_set(self) -> frozenset[int]:
+        """Get Telegram IDs with admin rights from config (admins and developer)."""
+        ids = set(self.admin_ids)
+        if self.developer_id is not None:
+            ids.add(self.developer_id)
+        return frozenset(ids)
+
     @property
     def is_production(self) -> bool:
         """Check if running in production."""
         return self.environment == Environment.PRODUCTION
 
 
-# Global settings instance
-settings = Settings()
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Get application settings, loading them on first use."""
+    return Settings()
+
+
+def __getattr__(name: str):
+    """Resolve ``settings`` lazily so importing this module parses nothing."""
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
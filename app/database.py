@@ -1,13 +1,21 @@
 """Database connection and session management."""
+import asyncio
 import logging
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
-
-from sqlalchemy import event
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from functools import lru_cache
+from enum import Enum
+from typing import AsyncGenerator, Awaitable, Callable, Dict, Optional, Type
+
+import orjson
+from sqlalchemy import JSON, Enum as SQLEnum, event, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+)
 from sqlalchemy.orm import DeclarativeBase
 
-from app.config import settings
+from app.config import get_settings
 
 logger = logging.getLogger(__name__)
 
@@ -17,37 +25,83 @@ class Base(DeclarativeBase):
     pass
 
 
-# Create async engine
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    pool_pre_ping=True,
-    pool_recycle=3600,
-)
+# JSON documents are stored as binary JSONB on PostgreSQL
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
 
-# Session factory
-async_session_factory = async_sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
+
+def _json_serializer(value) -> str:
+    """Serialize JSON column values with orjson."""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def enum_column(enum_cls: Type[Enum], length: int) -> SQLEnum:
+    """Enum column type stored as the members' values in a short VARCHAR."""
+    return SQLEnum(
+        enum_cls,
+        native_enum=False,
+        length=length,
+        values_callable=lambda members: [member.value for member in members],
+    )
 
 
-@event.listens_for(engine.sync_engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
     """Set SQLite pragmas for better performance."""
-    if "sqlite" in settings.database_url:
-        cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
-        cursor.execute("PRAGMA journal_mode=WAL")
-        cursor.execute("PRAGMA synchronous=NORMAL")
-        cursor.execute("PRAGMA cache_size=10000")
-        cursor.execute("PRAGMA temp_store=MEMORY")
-        cursor.close()
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=10000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # Read pages through a 256 MB memory map
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+@lru_cache(maxsize=1)
+def get_engine() -> AsyncEngine:
+    """Get async engine, creating it on first use."""
+    settings = get_settings()
+    
+    is_sqlite = "sqlite" in settings.database_url
+    
+    # Driver-specific connection arguments
+    connect_args = {}
+    if "asyncpg" in settings.database_url:
+        connect_args["command_timeout"] = settings.db_command_timeout
+    elif is_sqlite:
+        connect_args["cached_statements"] = 256
+    
+    engine = create_async_engine(
+        settings.database_url,
+        echo=settings.debug,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        # Local SQLite connections never go stale, so skip the ping and recycling
+        pool_recycle=-1 if is_sqlite else settings.db_pool_recycle,
+        pool_pre_ping=not is_sqlite,
+        connect_args=connect_args,
+        json_serializer=_json_serializer,
+        json_deserializer=orjson.loads,
+    )
+    
+    if is_sqlite:
+        event.listen(engine.sync_engine, "connect", set_sqlite_pragma)
+    
+    return engine
+
+
+@lru_cache(maxsize=1)
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Get session factory bound to the engine."""
+    return async_sessionmaker(get_engine(), class_=AsyncSession, expire_on_commit=False)
 
 
 @asynccontextmanager
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """Get database session with automatic cleanup."""
-    async with async_session_factory() as session:
+    async with get_session_factory()() as session:
         try:
             yield session
             await session.commit()
@@ -56,17 +110,63 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
             raise
         finally:
             await session.close()
+    
+    for callback in session.info.pop("after_commit", ()):
+        await callback()
+
+
+def after_commit(session: AsyncSession, callback: Callable[[], Awaitable[None]]) -> None:
+    """Run callback once the session opened by get_session() has committed."""
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+@asynccontextmanager
+async def session_scope(session: Optional[AsyncSession] = None) -> AsyncGenerator[AsyncSession, None]:
+    """Use caller's session (the caller commits), or open a new one."""
+    if session is not None:
+        yield session
+    else:
+        async with get_session() as new_session:
+            yield new_session
+
+
+def get_pool_status() -> Dict[str, int]:
+    """Get connection pool usage."""
+    pool = get_engine().pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": get_settings().db_max_overflow,
+    }
+
+
+async def _ping() -> None:
+    """Check out a pooled connection and run a trivial query."""
+    async with get_engine().connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def warm_connection_pool(size: int) -> None:
+    """Open pool connections up front so first requests skip connection setup."""
+    size = min(size, get_settings().db_pool_size)
+    if size <= 0:
+        return
+    
+    # Concurrent checkouts force the pool to open distinct connections
+    await asyncio.gather(*(_ping() for _ in range(size)))
+    logger.info(f"Warmed database pool with {size} connections")
 
 
 async def init_database() -> None:
     """Initialize database and create tables."""
     try:
-        # Import all models to ensure they're registered
-        from app.models import user, product, order, referral  # noqa
-        
-        async with engine.begin() as conn:
+        async with get_engine().begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
         
+        await warm_connection_pool(get_settings().db_warm_size)
+        
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
@@ -75,5 +175,18 @@ async def init_database() -> None:
 
 async def close_database() -> None:
     """Close database connections."""
+    engine = get_engine()
+    if engine.dialect.name == "sqlite":
+        # Let SQLite refresh query planner statistics before shutdown
+        try:
+            async with engine.connect() as conn:
+                await conn.exec_driver_sql("PRAGMA optimize")
+        except Exception as e:
+            logger.warning(f"Failed to optimize SQLite database: {e}")
+    
     await engine.dispose()
-    logger.info("Database connections closed")
\ No newline at end of file
+    logger.info("Database connections closed")
+
+
+# Register all models on Base.metadata; imported last because the models import Base from here
+from app.models import order, product, referral, user  # noqa: E402, F401
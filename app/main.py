@@ -1,42 +1,69 @@
 """Main application entry point."""
 import asyncio
+import atexit
 import logging
+import queue
 import sys
 from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from aiogram import Bot, Dispatcher
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 from aiohttp import web
 
-from app.config import settings
+from app.cache.backend import close_cache
+from app.config import get_settings
 from app.database import init_database, close_database
 from app.bot.handlers import start, catalog, order, admin
-from app.bot.middleware import UserMiddleware, AdminMiddleware, LoggingMiddleware
+from app.services.product_service import ProductService
+from app.bot.middleware import CompositeMiddleware
+from app.bot.session import create_session
 from app.api.webhooks import router as webhooks_router
 from app.api.admin import router as admin_api_router
-from app.tasks.scheduler import start_scheduler, stop_scheduler
-
-# Configure logging
-handlers = [logging.StreamHandler(sys.stdout)]
-
-# Only add file handler in production and if data directory is writable
-if settings.is_production:
-    try:
-        # Create data directory if it doesn't exist
-        settings.data_dir.mkdir(exist_ok=True)
-        handlers.append(logging.FileHandler(settings.data_dir / "bot.log", encoding="utf-8"))
-    except (PermissionError, OSError) as e:
-        print(f"Warning: Could not create log file: {e}")
-
-logging.basicConfig(
-    level=getattr(logging, settings.log_level.upper()),
-    format=settings.log_format,
-    handlers=handlers
+from app.tasks.scheduler import (
+    flush_user_activity, refresh_banned_users, start_scheduler, stop_scheduler
 )
 
 logger = logging.getLogger(__name__)
 
+# Shared by every dispatcher built in this process
+_MIDDLEWARE = CompositeMiddleware()
+
+
+def setup_logging() -> None:
+    """Configure root logging from settings.
+    
+    Records are queued and written by a background thread so log calls
+    never block the event loop on console or file IO.
+    """
+    settings = get_settings()
+    handlers = [logging.StreamHandler(sys.stdout)]
+    
+    # Only add file handler in production and if data directory is writable
+    if settings.is_production:
+        try:
+            # Create data directory if it doesn't exist
+            settings.data_dir.mkdir(exist_ok=True)
+            handlers.append(logging.FileHandler(settings.data_dir / "bot.log", encoding="utf-8"))
+        except (PermissionError, OSError) as e:
+            print(f"Warning: Could not create log file: {e}")
+    
+    formatter = logging.Formatter(settings.log_format)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    # Write out queued records when the process exits
+    atexit.register(listener.stop)
+    
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, settings.log_level.upper()))
+    root.addHandler(QueueHandler(log_queue))
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -46,11 +73,13 @@ async def lifespan(app: FastAPI):
     # Initialize database
     await init_database()
     
+    # Load banned users before the bot starts handling updates
+    await refresh_banned_users()
+    
     # Start background tasks
     await start_scheduler()
     
     # Load products from JSON if available
-    from app.services.product_service import ProductService
     await ProductService.load_products_from_json()
     
     logger.info("Digital Store Bot started successfully!")
@@ -62,19 +91,27 @@ async def lifespan(app: FastAPI):
     # Stop background tasks
     await stop_scheduler()
     
+    # Write activity still buffered in memory
+    await flush_user_activity()
+    
     # Close database connections
     await close_database()
     
+    # Close cache connections
+    await close_cache()
+    
     logger.info("Digital Store Bot stopped.")
 
 
 def create_app() -> FastAPI:
     """Create FastAPI application."""
+    settings = get_settings()
     app = FastAPI(
         title="Digital Store Bot",
         description="Telegram bot for selling digital products",
         version="1.0.0",
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
         docs_url="/docs" if not settings.is_production else None,
         redoc_url="/redoc" if not settings.is_production else None
     )
@@ -89,18 +126,13 @@ def create_app() -> FastAPI:
 def setup_bot() -> tuple[Bot, Dispatcher]:
     """Setup bot and dispatcher."""
     # Create bot instance
-    bot = Bot(token=settings.bot_token)
+    bot = Bot(token=get_settings().bot_token, session=create_session())
     
     # Create dispatcher
     dp = Dispatcher()
     
-    # Add middlewares
-    dp.message.middleware(LoggingMiddleware())
-    dp.callback_query.middleware(LoggingMiddleware())
-    dp.message.middleware(UserMiddleware())
-    dp.callback_query.middleware(UserMiddleware())
-    dp.message.middleware(AdminMiddleware())
-    dp.callback_query.middleware(AdminMiddleware())
+    # One middleware pass per update, whatever its type
+    dp.update.outer_middleware(_MIDDLEWARE)
     
     # Include routers
     dp.include_router(start.router)
@@ -113,16 +145,22 @@ def setup_bot() -> tuple[Bot, Dispatcher]:
 
 async def setup_webhook(bot: Bot, dp: Dispatcher, app: FastAPI) -> None:
     """Setup webhook for bot."""
+    settings = get_settings()
     if not settings.webhook_url:
         logger.error("Webhook URL not configured")
         return
     
-    # Set webhook
+    # Walks every registered handler, so resolve it once
+    allowed_updates = sorted(dp.resolve_used_update_types())
+    
     webhook_info = await bot.get_webhook_info()
-    if webhook_info.url != settings.webhook_url:
+    if (
+        webhook_info.url != settings.webhook_url
+        or sorted(webhook_info.allowed_updates or []) != allowed_updates
+    ):
         await bot.set_webhook(
             url=settings.webhook_url,
-            allowed_updates=dp.resolve_used_update_types(),
+            allowed_updates=allowed_updates,
             drop_pending_updates=True
         )
         logger.info(f"Webhook set to: {settings.webhook_url}")
@@ -154,8 +192,22 @@ async def start_polling(bot: Bot, dp: Dispatcher) -> None:
     await dp.start_polling(bot, skip_updates=True)
 
 
+def install_event_loop() -> None:
+    """Use uvloop as the event loop when available (installed with uvicorn[standard])."""
+    try:
+        import uvloop
+    except ImportError:
+        logger.info("uvloop not available, using default asyncio event loop")
+        return
+    
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    logger.info("Using uvloop event loop")
+
+
 async def main() -> None:
     """Main application function."""
+    settings = get_settings()
+    
     # Create FastAPI app
     app = create_app()
     
@@ -172,6 +224,7 @@ async def main() -> None:
             app,
             host=settings.host,
             port=settings.port,
+            http="httptools",  # C parser shipped with uvicorn[standard]
             log_config=None  # Use our logging config
         )
         server = uvicorn.Server(config)
@@ -185,6 +238,8 @@ async def main() -> None:
 
 
 if __name__ == "__main__":
+    setup_logging()
+    install_event_loop()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -1,16 +1,25 @@
 """Order model."""
 from datetime import datetime
 from decimal import Decimal
-from enum import Enum
+from enum import StrEnum
 from typing import Dict, Optional
 
-from sqlalchemy import JSON, BigInteger, DateTime, ForeignKey, Numeric, String, Text, func
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import (
+    BigInteger, ColumnElement, DateTime, ForeignKey, Index, Numeric, String, Text, func
+)
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
-from app.database import Base
+from app.database import Base, JSONDocument, enum_column
+from app.utils.helpers import CURRENCY_FORMATTERS, as_utc, utcnow
 
 
-class OrderStatus(str, Enum):
+def _format_minutes(value: datetime) -> str:
+    """Format datetime to minutes, dropping any UTC offset."""
+    return value.isoformat(sep=" ", timespec="minutes")[:16]
+
+
+class OrderStatus(StrEnum):
     """Order status types."""
     PENDING = "pending"
     PROCESSING = "processing"
@@ -20,22 +29,35 @@ class OrderStatus(str, Enum):
     REFUNDED = "refunded"
 
 
-class PaymentGateway(str, Enum):
+class PaymentGateway(StrEnum):
     """Supported payment gateways."""
     TELEGRAM_STARS = "telegram_stars"
     CRYPTOMUS = "cryptomus"
 
 
+# Plain status strings for the hot status checks below
+_STATUS_PENDING = OrderStatus.PENDING.value
+_STATUS_PROCESSING = OrderStatus.PROCESSING.value
+_STATUS_COMPLETED = OrderStatus.COMPLETED.value
+_STATUS_CANCELLED = OrderStatus.CANCELLED.value
+_AWAITING_PAYMENT_STATUSES = frozenset((_STATUS_PENDING, _STATUS_PROCESSING))
+
+
 class Order(Base):
     """Order model for purchases."""
     
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_status_id", "status", "id"),
+        Index("ix_orders_user_status", "user_id", "status"),
+        Index("ix_orders_status_created", "status", "created_at"),
+    )
     
     # Primary key
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     
     # Order identification
-    order_number: Mapped[str] = mapped_column(String(50), unique=True, index=True)
+    order_number: Mapped[str] = mapped_column(String(20), unique=True, index=True)
     
     # Foreign keys
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id"), index=True)
@@ -48,13 +70,17 @@ class Order(Base):
     currency: Mapped[str] = mapped_column(String(3), nullable=False)
     
     # Status and payment
-    status: Mapped[str] = mapped_column(String(20), default=OrderStatus.PENDING.value, index=True)
-    payment_gateway: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    status: Mapped[OrderStatus] = mapped_column(
+        enum_column(OrderStatus, 12), default=OrderStatus.PENDING, index=True
+    )
+    payment_gateway: Mapped[Optional[PaymentGateway]] = mapped_column(
+        enum_column(PaymentGateway, 16), nullable=True
+    )
     payment_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True, index=True)
-    payment_data: Mapped[Optional[Dict]] = mapped_column(JSON, nullable=True)
+    payment_data: Mapped[Optional[Dict]] = mapped_column(JSONDocument, nullable=True)
     
     # Delivery
-    delivery_data: Mapped[Optional[Dict]] = mapped_column(JSON, nullable=True)
+    delivery_data: Mapped[Optional[Dict]] = mapped_column(JSONDocument, nullable=True)
     delivery_message: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     delivered_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     
@@ -76,54 +102,79 @@ class Order(Base):
     )
     expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     
-    # Relationships
-    user: Mapped["User"] = relationship("User", back_populates="orders")
-    product: Mapped["Product"] = relationship("Product", back_populates="orders")
+    # Relationships (never lazy-loaded; use selectinload/joinedload)
+    user: Mapped["User"] = relationship("User", back_populates="orders", lazy="raise_on_sql")
+    product: Mapped["Product"] = relationship("Product", back_populates="orders", lazy="raise_on_sql")
+    
+    @validates("order_number")
+    def _validate_order_number(self, key: str, value: str) -> str:
+        """Reject order numbers that do not fit the column."""
+        if not value or len(value) > 20:
+            raise ValueError(f"Invalid order number: {value!r}")
+        return value
     
     def __repr__(self) -> str:
         return f"<Order(id={self.id}, order_number={self.order_number}, status={self.status})>"
     
-    @property
+    @hybrid_property
     def is_pending(self) -> bool:
         """Check if order is pending."""
-        return self.status == OrderStatus.PENDING.value
+        return self.status == _STATUS_PENDING
     
-    @property
+    @hybrid_property
+    def is_awaiting_payment(self) -> bool:
+        """Check if order is pending or has a payment in progress."""
+        return self.status in _AWAITING_PAYMENT_STATUSES
+    
+    @is_awaiting_payment.inplace.expression
+    @classmethod
+    def _is_awaiting_payment_expression(cls) -> ColumnElement[bool]:
+        """SQL condition matching orders awaiting payment."""
+        return cls.status.in_(_AWAITING_PAYMENT_STATUSES)
+    
+    @hybrid_property
     def is_completed(self) -> bool:
         """Check if order is completed."""
-        return self.status == OrderStatus.COMPLETED.value
+        return self.status == _STATUS_COMPLETED
     
-    @property
+    @hybrid_property
     def is_cancelled(self) -> bool:
         """Check if order is cancelled."""
-        return self.status == OrderStatus.CANCELLED.value
+        return self.status == _STATUS_CANCELLED
     
     @property
     def is_expired(self) -> bool:
         """Check if order is expired."""
         if not self.expires_at:
             return False
-        return datetime.now() > self.expires_at
+        return utcnow() > as_utc(self.expires_at)
     
     @property
     def formatted_total(self) -> str:
         """Get formatted total price."""
-        if self.currency == "XTR":
-            return f"{self.total_price} ⭐"
-        elif self.currency == "RUB":
-            return f"{self.total_price} ₽"
-        elif self.currency == "USD":
-            return f"${self.total_price}"
-        elif self.currency == "EUR":
-            return f"{self.total_price} €"
-        else:
-            return f"{self.total_price} {self.currency}"
+        formatter = CURRENCY_FORMATTERS.get(self.currency)
+        return formatter(self.total_price) if formatter else f"{self.total_price} {self.currency}"
+    
+    @property
+    def formatted_created_at(self) -> str:
+        """Get creation time as YYYY-MM-DD HH:MM."""
+        return _format_minutes(self.created_at)
+    
+    @property
+    def formatted_expires_at(self) -> Optional[str]:
+        """Get expiration time as YYYY-MM-DD HH:MM."""
+        return _format_minutes(self.expires_at) if self.expires_at else None
+    
+    @property
+    def formatted_delivered_at(self) -> Optional[str]:
+        """Get delivery time as YYYY-MM-DD HH:MM."""
+        return _format_minutes(self.delivered_at) if self.delivered_at else None
     
     def mark_as_completed(self) -> None:
         """Mark order as completed."""
-        self.status = OrderStatus.COMPLETED.value
-        self.delivered_at = datetime.now()
+        self.status = _STATUS_COMPLETED
+        self.delivered_at = utcnow()
     
     def mark_as_cancelled(self) -> None:
         """Mark order as cancelled."""
-        self.status = OrderStatus.CANCELLED.value
\ No newline at end of file
+        self.status = _STATUS_CANCELLED
\ No newline at end of file
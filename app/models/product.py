@@ -4,10 +4,14 @@ from decimal import Decimal
 from enum import Enum
 from typing import Dict, Optional
 
-from sqlalchemy import JSON, Boolean, DateTime, Numeric, String, Text, func
+from sqlalchemy import (
+    Boolean, ColumnElement, DateTime, Index, Numeric, String, Text, and_, func, or_, text
+)
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from app.database import Base
+from app.database import Base, JSONDocument
+from app.utils.helpers import CURRENCY_FORMATTERS
 
 
 class ProductCategory(str, Enum):
@@ -32,6 +36,17 @@ class Product(Base):
     """Product model for digital goods."""
     
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_active_id", "is_active", "id"),
+        # Partial index covering only purchasable products
+        Index(
+            "ix_products_available",
+            "category",
+            "id",
+            postgresql_where=text("is_active AND (stock_count IS NULL OR stock_count > 0)"),
+            sqlite_where=text("is_active AND (stock_count IS NULL OR stock_count > 0)"),
+        ),
+    )
     
     # Primary key
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
@@ -54,7 +69,7 @@ class Product(Base):
     sold_count: Mapped[int] = mapped_column(default=0)
     
     # Delivery configuration
-    delivery_config: Mapped[Optional[Dict]] = mapped_column(JSON, nullable=True)
+    delivery_config: Mapped[Optional[Dict]] = mapped_column(JSONDocument, nullable=True)
     
     # Status
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
@@ -78,37 +93,51 @@ class Product(Base):
         nullable=False
     )
     
-    # Relationships
-    orders: Mapped[list["Order"]] = relationship("Order", back_populates="product")
+    # Relationships (never lazy-loaded; use selectinload/joinedload)
+    orders: Mapped[list["Order"]] = relationship(
+        "Order", back_populates="product", lazy="raise_on_sql"
+    )
     
     def __repr__(self) -> str:
         return f"<Product(id={self.id}, name={self.name}, price={self.price})>"
     
-    @property
+    @hybrid_property
     def is_in_stock(self) -> bool:
         """Check if product is in stock."""
         if self.stock_count is None:  # Unlimited stock
             return True
         return self.stock_count > 0
     
-    @property
+    @is_in_stock.inplace.expression
+    @classmethod
+    def _is_in_stock_expression(cls) -> ColumnElement[bool]:
+        """SQL condition matching products in stock."""
+        return or_(cls.stock_count.is_(None), cls.stock_count > 0)
+    
+    @hybrid_property
     def is_available(self) -> bool:
         """Check if product is available for purchase."""
         return self.is_active and self.is_in_stock
     
+    @is_available.inplace.expression
+    @classmethod
+    def _is_available_expression(cls) -> ColumnElement[bool]:
+        """SQL condition matching products available for purchase."""
+        return cls.available_criteria()
+    
+    @classmethod
+    def available_criteria(cls, quantity: int = 1) -> ColumnElement[bool]:
+        """SQL condition matching products that can be bought in given quantity."""
+        return and_(
+            cls.is_active,
+            or_(cls.stock_count.is_(None), cls.stock_count >= quantity)
+        )
+    
     @property
     def formatted_price(self) -> str:
         """Get formatted price string."""
-        if self.currency == "XTR":
-            return f"{self.price} ⭐"
-        elif self.currency == "RUB":
-            return f"{self.price} ₽"
-        elif self.currency == "USD":
-            return f"${self.price}"
-        elif self.currency == "EUR":
-            return f"{self.price} €"
-        else:
-            return f"{self.price} {self.currency}"
+        formatter = CURRENCY_FORMATTERS.get(self.currency)
+        return formatter(self.price) if formatter else f"{self.price} {self.currency}"
     
     def decrease_stock(self, amount: int = 1) -> bool:
         """Decrease stock count."""
@@ -1,16 +1,18 @@
 """Referral model."""
 from datetime import datetime
 from decimal import Decimal
-from enum import Enum
+from enum import StrEnum
 from typing import Optional
 
 from sqlalchemy import BigInteger, Boolean, DateTime, ForeignKey, Numeric, String, func
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from app.database import Base
+from app.database import Base, enum_column
+from app.utils.helpers import utcnow
 
 
-class ReferralStatus(str, Enum):
+class ReferralStatus(StrEnum):
     """Referral status types."""
     PENDING = "pending"
     ACTIVE = "active"
@@ -18,6 +20,12 @@ class ReferralStatus(str, Enum):
     EXPIRED = "expired"
 
 
+# Plain status strings for the hot status checks below
+_STATUS_PENDING = ReferralStatus.PENDING.value
+_STATUS_ACTIVE = ReferralStatus.ACTIVE.value
+_STATUS_REWARDED = ReferralStatus.REWARDED.value
+
+
 class Referral(Base):
     """Referral relationship model."""
     
@@ -32,7 +40,9 @@ class Referral(Base):
     
     # Referral details
     referral_code: Mapped[str] = mapped_column(String(50), index=True)
-    status: Mapped[str] = mapped_column(String(20), default=ReferralStatus.PENDING.value)
+    status: Mapped[ReferralStatus] = mapped_column(
+        enum_column(ReferralStatus, 10), default=ReferralStatus.PENDING
+    )
     
     # Reward tracking
     reward_given: Mapped[bool] = mapped_column(Boolean, default=False)
@@ -52,47 +62,49 @@ class Referral(Base):
     activated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     rewarded_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     
-    # Relationships
+    # Relationships (never lazy-loaded; use selectinload/joinedload)
     referrer: Mapped["User"] = relationship(
         "User", 
         foreign_keys=[referrer_id],
-        back_populates="referrals"
+        back_populates="referrals",
+        lazy="raise_on_sql"
     )
     referred: Mapped["User"] = relationship(
         "User", 
-        foreign_keys=[referred_id]
+        foreign_keys=[referred_id],
+        lazy="raise_on_sql"
     )
     
     def __repr__(self) -> str:
         return f"<Referral(id={self.id}, referrer_id={self.referrer_id}, referred_id={self.referred_id})>"
     
-    @property
+    @hybrid_property
     def is_pending(self) -> bool:
         """Check if referral is pending."""
-        return self.status == ReferralStatus.PENDING.value
+        return self.status == _STATUS_PENDING
     
-    @property
+    @hybrid_property
     def is_active(self) -> bool:
         """Check if referral is active."""
-        return self.status == ReferralStatus.ACTIVE.value
+        return self.status == _STATUS_ACTIVE
     
-    @property
+    @hybrid_property
     def is_rewarded(self) -> bool:
         """Check if referral has been rewarded."""
         return self.reward_given
     
     def activate(self) -> None:
         """Activate the referral."""
-        self.status = ReferralStatus.ACTIVE.value
-        self.activated_at = datetime.now()
+        self.status = _STATUS_ACTIVE
+        self.activated_at = utcnow()
     
     def mark_as_rewarded(self, reward_amount: Optional[Decimal] = None, 
                         reward_currency: Optional[str] = None,
                         reward_type: Optional[str] = None) -> None:
         """Mark referral as rewarded."""
-        self.status = ReferralStatus.REWARDED.value
+        self.status = _STATUS_REWARDED
         self.reward_given = True
-        self.rewarded_at = datetime.now()
+        self.rewarded_at = utcnow()
         
         if reward_amount:
             self.reward_amount = reward_amount
@@ -1,11 +1,15 @@
 """User model."""
 from datetime import datetime
+from functools import cached_property
 from typing import Optional
 
-from sqlalchemy import BigInteger, Boolean, DateTime, String, func
+from sqlalchemy import BigInteger, Boolean, DateTime, String, exists, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
+from app.models.referral import Referral
+from app.utils.helpers import as_utc, utcnow
 
 
 class User(Base):
@@ -55,12 +59,13 @@ class User(Base):
         nullable=True
     )
     
-    # Relationships
-    orders: Mapped[list["Order"]] = relationship("Order", back_populates="user")
+    # Relationships (never lazy-loaded; use selectinload/joinedload)
+    orders: Mapped[list["Order"]] = relationship("Order", back_populates="user", lazy="raise_on_sql")
     referrals: Mapped[list["Referral"]] = relationship(
         "Referral", 
         foreign_keys="Referral.referrer_id",
-        back_populates="referrer"
+        back_populates="referrer",
+        lazy="raise_on_sql"
     )
     
     def __repr__(self) -> str:
@@ -79,14 +84,23 @@ class User(Base):
         else:
             return f"User#{self.telegram_id}"
     
+    @cached_property
+    def joined_fmt(self) -> str:
+        """Get registration date as YYYY-MM-DD (computed once per instance)."""
+        return self.created_at.date().isoformat()
+    
     @property
     def has_active_trial(self) -> bool:
         """Check if user has active trial."""
         if not self.trial_start or not self.trial_end:
             return False
-        now = datetime.now()
-        return self.trial_start <= now <= self.trial_end
+        now = utcnow()
+        return as_utc(self.trial_start) <= now <= as_utc(self.trial_end)
     
-    def is_referrer_of(self, user_id: int) -> bool:
-        """Check if this user is referrer of another user."""
-        return any(ref.referred_id == user_id for ref in self.referrals)
\ No newline at end of file
+    async def is_referrer_of(self, session: AsyncSession, user_id: int) -> bool:
+        """Check if this user is referrer of another user without loading referrals."""
+        query = select(exists().where(
+            Referral.referrer_id == self.id,
+            Referral.referred_id == user_id
+        ))
+        return bool(await session.scalar(query))
@@ -3,9 +3,10 @@ from datetime import datetime
 from decimal import Decimal
 from typing import Dict, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 
 from app.models.order import OrderStatus, PaymentGateway
+from app.utils.helpers import CURRENCY_FORMATTERS, as_utc, utcnow
 
 
 class OrderBase(BaseModel):
@@ -24,6 +25,7 @@ class OrderCreate(OrderBase):
 class OrderUpdate(BaseModel):
     """Schema for updating an order."""
     status: Optional[str] = Field(None, description="Order status")
+    payment_gateway: Optional[str] = Field(None, description="Payment gateway")
     payment_id: Optional[str] = Field(None, description="Payment ID")
     payment_data: Optional[Dict] = Field(None, description="Payment data")
     delivery_data: Optional[Dict] = Field(None, description="Delivery data")
@@ -52,14 +54,40 @@ class OrderResponse(OrderBase):
     updated_at: datetime
     expires_at: Optional[datetime] = None
     
-    # Computed fields
-    is_pending: bool
-    is_completed: bool
-    is_cancelled: bool
-    is_expired: bool
-    formatted_total: str
+    model_config = {"from_attributes": True, "frozen": True}
+    
+    # Computed from the validated columns at serialization time, so reading
+    # an ORM object only touches plain column attributes
+    @computed_field
+    @property
+    def is_pending(self) -> bool:
+        """Check if order is pending."""
+        return self.status == OrderStatus.PENDING
+    
+    @computed_field
+    @property
+    def is_completed(self) -> bool:
+        """Check if order is completed."""
+        return self.status == OrderStatus.COMPLETED
+    
+    @computed_field
+    @property
+    def is_cancelled(self) -> bool:
+        """Check if order is cancelled."""
+        return self.status == OrderStatus.CANCELLED
+    
+    @computed_field
+    @property
+    def is_expired(self) -> bool:
+        """Check if order is expired."""
+        return self.expires_at is not None and utcnow() > as_utc(self.expires_at)
     
-    model_config = {"from_attributes": True}
+    @computed_field
+    @property
+    def formatted_total(self) -> str:
+        """Get formatted total price."""
+        formatter = CURRENCY_FORMATTERS.get(self.currency)
+        return formatter(self.total_price) if formatter else f"{self.total_price} {self.currency}"
 
 
 class OrderList(BaseModel):
@@ -3,9 +3,10 @@ from datetime import datetime
 from decimal import Decimal
 from typing import Dict, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 
 from app.models.product import DeliveryType, ProductCategory
+from app.utils.helpers import CURRENCY_FORMATTERS
 
 
 class ProductBase(BaseModel):
@@ -62,12 +63,28 @@ class ProductResponse(ProductBase):
     created_at: datetime
     updated_at: datetime
     
-    # Computed fields
-    is_in_stock: bool
-    is_available: bool
-    formatted_price: str
+    model_config = {"from_attributes": True, "frozen": True}
     
-    model_config = {"from_attributes": True}
+    # Computed from the validated columns at serialization time, so reading
+    # an ORM object only touches plain column attributes
+    @computed_field
+    @property
+    def is_in_stock(self) -> bool:
+        """Check if product is in stock."""
+        return self.stock_count is None or self.stock_count > 0
+    
+    @computed_field
+    @property
+    def is_available(self) -> bool:
+        """Check if product is available for purchase."""
+        return self.is_active and self.is_in_stock
+    
+    @computed_field
+    @property
+    def formatted_price(self) -> str:
+        """Get formatted price string."""
+        formatter = CURRENCY_FORMATTERS.get(self.currency)
+        return formatter(self.price) if formatter else f"{self.price} {self.currency}"
 
 
 class ProductList(BaseModel):
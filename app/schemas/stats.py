@@ -0,0 +1,13 @@
+"""Combined statistics schemas."""
+from pydantic import BaseModel
+
+from app.schemas.order import OrderStats
+from app.schemas.product import ProductStats
+from app.schemas.user import UserStats
+
+
+class AdminStats(BaseModel):
+    """Admin dashboard statistics schema."""
+    users: UserStats
+    products: ProductStats
+    orders: OrderStats
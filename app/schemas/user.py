@@ -45,7 +45,7 @@ class UserResponse(UserBase):
     updated_at: datetime
     last_activity: Optional[datetime] = None
     
-    model_config = {"from_attributes": True}
+    model_config = {"from_attributes": True, "frozen": True}
 
 
 class UserStats(BaseModel):
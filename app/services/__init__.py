@@ -4,11 +4,13 @@ from app.services.product_service import ProductService
 from app.services.order_service import OrderService
 from app.services.payment_service import PaymentService
 from app.services.notification_service import NotificationService
+from app.services.stats_service import StatsService
 
 __all__ = [
     "UserService",
     "ProductService", 
     "OrderService",
     "PaymentService",
-    "NotificationService"
+    "NotificationService",
+    "StatsService"
 ]
\ No newline at end of file
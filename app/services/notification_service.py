@@ -1,20 +1,32 @@
 """Notification service for sending messages to users and admins."""
+import asyncio
 import logging
 from typing import List, Optional
 
 from aiogram import Bot
 from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Broadcast sends in flight at once; each slot is held long enough to stay
+# under Telegram's global limit of about 30 messages per second
+BROADCAST_CONCURRENCY = 25
+BROADCAST_RATE_LIMIT = 30
+
 
 class NotificationService:
     """Service for sending notifications."""
     
     def __init__(self, bot: Bot):
         self.bot = bot
+        self.refresh_admins()
+    
+    def refresh_admins(self) -> None:
+        """Re-read admin IDs from settings."""
+        self._admin_ids = tuple(settings.admin_ids)
     
     async def send_user_message(
         self,
@@ -44,17 +56,18 @@ class NotificationService:
         parse_mode: Optional[str] = ParseMode.HTML
     ) -> int:
         """Send message to all admin users."""
-        if not settings.admin_ids:
+        admin_ids = self._admin_ids
+        if not admin_ids:
             logger.warning("No admin IDs configured")
             return 0
         
-        sent_count = 0
-        for admin_id in settings.admin_ids:
-            success = await self.send_user_message(admin_id, message, parse_mode)
-            if success:
-                sent_count += 1
+        results = await asyncio.gather(
+            *(self.send_user_message(admin_id, message, parse_mode) for admin_id in admin_ids),
+            return_exceptions=True
+        )
+        sent_count = sum(result is True for result in results)
         
-        logger.info(f"Sent admin message to {sent_count}/{len(settings.admin_ids)} admins")
+        logger.info(f"Sent admin message to {sent_count}/{len(admin_ids)} admins")
         return sent_count
     
     async def send_developer_message(
@@ -81,8 +94,24 @@ class NotificationService:
             "failed": 0,
             "blocked": 0
         }
+        semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+        slot_interval = BROADCAST_CONCURRENCY / BROADCAST_RATE_LIMIT
+        
+        async def send(user_id: int) -> str:
+            async with semaphore:
+                outcome = await self._send_broadcast(user_id, message, parse_mode)
+                await asyncio.sleep(slot_interval)
+                return outcome
         
-        for user_id in user_ids:
+        for outcome in await asyncio.gather(*(send(user_id) for user_id in user_ids)):
+            results[outcome] += 1
+        
+        logger.info(f"Broadcast results: {results}")
+        return results
+    
+    async def _send_broadcast(self, user_id: int, message: str, parse_mode: Optional[str]) -> str:
+        """Send one broadcast message and return the results key it counts towards."""
+        for attempt in range(2):
             try:
                 await self.bot.send_message(
                     chat_id=user_id,
@@ -90,19 +119,24 @@ class NotificationService:
                     parse_mode=parse_mode,
                     disable_web_page_preview=True
                 )
-                results["sent"] += 1
-                
+                return "sent"
+            
+            except TelegramRetryAfter as e:
+                # Flood control: wait as told and retry once
+                if attempt:
+                    logger.debug(f"Failed to send broadcast to user {user_id}: {e}")
+                    return "failed"
+                await asyncio.sleep(e.retry_after)
+            
+            except TelegramForbiddenError as e:
+                logger.debug(f"Failed to send broadcast to user {user_id}: {e}")
+                return "blocked"
+            
             except Exception as e:
-                error_str = str(e).lower()
-                if "blocked" in error_str or "forbidden" in error_str:
-                    results["blocked"] += 1
-                else:
-                    results["failed"] += 1
-                    
                 logger.debug(f"Failed to send broadcast to user {user_id}: {e}")
+                return "failed"
         
-        logger.info(f"Broadcast results: {results}")
-        return results
+        return "failed"
     
     async def notify_new_order(self, order_number: str, user_id: int, product_name: str, amount: str) -> None:
         """Notify admins about new order."""
@@ -1,34 +1,74 @@
 """Order service for managing orders and purchases."""
+import itertools
 import logging
-import secrets
 import string
-from datetime import datetime, timedelta
+import time
+from datetime import timedelta
 from decimal import Decimal
-from typing import List, Optional
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import func, select
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from app.database import get_session
+from app.cache.payment_cache import invalidate_payment
+from app.cache.stats_cache import invalidate_order_stats
+from app.database import after_commit, get_session, session_scope
 from app.models.order import Order, OrderStatus
 from app.models.product import Product
 from app.models.user import User
 from app.schemas.order import OrderCreate, OrderUpdate, OrderResponse, OrderStats
 from app.services.product_service import ProductService
 from app.config import settings
+from app.utils.helpers import utc_day_bounds, utcnow
+from app.utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+_get_by_id_flight = SingleFlight()
+
+# Order numbers are base36 of (milliseconds * 1296 + sequence), so they sort by creation time
+_ORDER_NUMBER_ALPHABET = string.digits + string.ascii_uppercase
+_order_sequence = itertools.count()
+
+
+async def _order_closed(order_id: int) -> None:
+    """Drop caches that still show an order as payable."""
+    await invalidate_payment(order_id)
+    await invalidate_order_stats()
+
 
 class OrderService:
     """Service for order management."""
     
     @staticmethod
     async def get_by_id(order_id: int) -> Optional[Order]:
-        """Get order by ID."""
+        """Get order by ID; concurrent lookups of one ID share a query."""
+        return await _get_by_id_flight.do(order_id, lambda: OrderService._load_by_id(order_id))
+    
+    @staticmethod
+    async def _load_by_id(order_id: int) -> Optional[Order]:
+        """Load order by ID from the database."""
         async with get_session() as session:
             return await session.get(Order, order_id)
     
+    @staticmethod
+    async def get_checkout_snapshot(order_id: int) -> Optional[Tuple[str, Decimal]]:
+        """Get (status, total_price) of an order without loading the entity."""
+        async with get_session() as session:
+            query = select(Order.status, Order.total_price).where(Order.id == order_id)
+            result = await session.execute(query)
+            row = result.one_or_none()
+            return tuple(row) if row else None
+    
+    @staticmethod
+    async def get_by_id_with_product(order_id: int) -> Optional[Order]:
+        """Get order by ID with its product loaded in the same query."""
+        async with get_session() as session:
+            return await session.get(Order, order_id, options=[joinedload(Order.product)])
+    
     @staticmethod
     async def get_by_order_number(order_number: str) -> Optional[Order]:
         """Get order by order number."""
@@ -42,76 +82,130 @@ class OrderService:
         user_id: int,
         status: Optional[str] = None,
         limit: Optional[int] = None,
-        offset: int = 0
+        offset: int = 0,
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None
     ) -> List[Order]:
-        """Get orders for a specific user."""
+        """Get orders for a specific user, newest first.
+        
+        after_id returns the orders listed after that one (older), before_id
+        the orders listed before it (newer); offset is ignored with either.
+        """
         async with get_session() as session:
             query = select(Order).where(Order.user_id == user_id)
             
             if status:
                 query = query.where(Order.status == status)
             
-            query = query.order_by(Order.created_at.desc())
+            # Ids follow creation order, so they double as the keyset
+            if before_id is not None:
+                query = query.where(Order.id > before_id).order_by(Order.id)
+            elif after_id is not None:
+                query = query.where(Order.id < after_id).order_by(Order.id.desc())
+            else:
+                query = query.order_by(Order.id.desc())
             
             if limit:
                 query = query.limit(limit)
-            if offset:
+            if offset and after_id is None and before_id is None:
                 query = query.offset(offset)
             
             result = await session.execute(query)
-            return list(result.scalars().all())
+            orders = list(result.scalars().all())
+            
+            if before_id is not None:
+                orders.reverse()
+            return orders
+    
+    @staticmethod
+    async def get_user_orders_page(
+        user_id: int,
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+        limit: int = 5
+    ) -> Dict[str, Any]:
+        """Get a page of user orders with has_prev/has_next flags.
+        
+        One extra row is fetched to tell whether another page exists,
+        without a COUNT over the user's order history.
+        """
+        orders = await OrderService.get_user_orders(
+            user_id, limit=limit + 1, after_id=after_id, before_id=before_id
+        )
+        if before_id is not None:
+            has_prev = len(orders) > limit
+            has_next = True
+            orders = orders[-limit:]
+        else:
+            has_prev = after_id is not None
+            has_next = len(orders) > limit
+            orders = orders[:limit]
+        
+        return {'orders': orders, 'has_prev': has_prev, 'has_next': has_next}
     
     @staticmethod
     async def get_all_orders(
         status: Optional[str] = None,
         limit: Optional[int] = None,
-        offset: int = 0
+        offset: int = 0,
+        after_id: Optional[int] = None
     ) -> List[Order]:
-        """Get all orders with optional filters."""
+        """Get all orders with optional filters.
+        
+        When after_id is given, returns orders older than that order
+        (keyset pagination over created_at, id) and offset is ignored.
+        """
         async with get_session() as session:
-            query = select(Order).order_by(Order.created_at.desc())
+            query = select(Order).order_by(Order.created_at.desc(), Order.id.desc())
             
             if status:
                 query = query.where(Order.status == status)
-                
+            
+            if after_id is not None:
+                cursor_created_at = (
+                    select(Order.created_at).where(Order.id == after_id).scalar_subquery()
+                )
+                query = query.where(
+                    tuple_(Order.created_at, Order.id) < tuple_(cursor_created_at, after_id)
+                )
+            
             if limit:
                 query = query.limit(limit)
-            if offset:
+            if offset and after_id is None:
                 query = query.offset(offset)
             
             result = await session.execute(query)
             return list(result.scalars().all())
     
     @staticmethod
-    async def create_order(user_id: int, order_data: OrderCreate) -> Optional[Order]:
-        """Create a new order."""
-        async with get_session() as session:
-            # Get product
-            product = await session.get(Product, order_data.product_id)
-            if not product or not product.is_available:
+    async def create_order(
+        user_id: int,
+        order_data: OrderCreate,
+        session: Optional[AsyncSession] = None
+    ) -> Optional[Order]:
+        """Create a new order, optionally within the caller's session."""
+        async with session_scope(session) as session:
+            # Get product only if it can be bought
+            query = select(Product).where(
+                Product.id == order_data.product_id,
+                Product.available_criteria(order_data.quantity)
+            )
+            result = await session.execute(query)
+            product = result.scalar_one_or_none()
+            if not product:
                 logger.warning(f"Product {order_data.product_id} not available for order")
                 return None
             
-            # Check stock
-            if not product.is_in_stock:
-                logger.warning(f"Product {product.name} is out of stock")
-                return None
-            
-            # Generate unique order number
-            order_number = OrderService._generate_order_number()
-            while await OrderService.get_by_order_number(order_number):
-                order_number = OrderService._generate_order_number()
-            
             # Calculate prices
             unit_price = product.price
             total_price = unit_price * order_data.quantity
             
             # Set expiration (15 minutes for pending orders)
-            expires_at = datetime.now() + timedelta(minutes=15)
+            expires_at = utcnow() + timedelta(minutes=15)
             
             # Create order
             order = Order(
-                order_number=order_number,
+                order_number=OrderService._generate_order_number(),
                 user_id=user_id,
                 product_id=order_data.product_id,
                 quantity=order_data.quantity,
@@ -125,41 +219,95 @@ class OrderService:
                 expires_at=expires_at
             )
             
-            session.add(order)
-            await session.commit()
+            await OrderService._insert_order(session, order)
             await session.refresh(order)
             
             logger.info(f"Created order: {order.order_number} for user {user_id}")
             return order
     
     @staticmethod
-    async def update_order(order_id: int, order_data: OrderUpdate) -> Optional[Order]:
-        """Update order information."""
+    async def create_order_for_product(
+        user_id: int,
+        product_id: int,
+        gateway: str,
+        quantity: int = 1
+    ) -> Optional[Tuple[Order, Product]]:
+        """Create a pending order for a product in one transaction.
+        
+        The product row is locked while availability is checked, so two
+        buyers cannot both pass the check for the last item in stock.
+        """
         async with get_session() as session:
-            order = await session.get(Order, order_id)
-            if not order:
+            # Unavailable or out-of-stock products match no row
+            query = (
+                select(Product)
+                .where(Product.id == product_id, Product.available_criteria(quantity))
+                .with_for_update()
+            )
+            result = await session.execute(query)
+            product = result.scalar_one_or_none()
+            
+            if not product:
+                logger.warning(f"Product {product_id} not available for order")
                 return None
             
-            update_data = order_data.model_dump(exclude_unset=True)
-            for field, value in update_data.items():
-                setattr(order, field, value)
+            order = Order(
+                order_number=OrderService._generate_order_number(),
+                user_id=user_id,
+                product_id=product.id,
+                quantity=quantity,
+                unit_price=product.price,
+                total_price=product.price * quantity,
+                currency=product.currency,
+                status=OrderStatus.PENDING.value,
+                payment_gateway=gateway,
+                expires_at=utcnow() + timedelta(minutes=15)
+            )
             
+            await OrderService._insert_order(session, order)
             await session.commit()
             await session.refresh(order)
             
-            logger.info(f"Updated order: {order.order_number}")
-            return order
+            logger.info(f"Created order: {order.order_number} for user {user_id}")
+            return order, product
     
     @staticmethod
-    async def complete_order(order_id: int, delivery_data: Optional[dict] = None) -> bool:
-        """Complete an order and handle delivery."""
+    async def update_order(order_id: int, order_data: OrderUpdate) -> Optional[Order]:
+        """Update order information with a single UPDATE ... RETURNING."""
+        update_data = order_data.model_dump(exclude_unset=True)
+        if not update_data:
+            return await OrderService.get_by_id(order_id)
+        
+        query = (
+            update(Order)
+            .where(Order.id == order_id)
+            .values(**update_data)
+            .returning(Order)
+        )
+        
         async with get_session() as session:
+            result = await session.execute(query)
+            order = result.scalar_one_or_none()
+            await session.commit()
+        
+        if order:
+            logger.info(f"Updated order: {order.order_number}")
+        return order
+    
+    @staticmethod
+    async def complete_order(
+        order_id: int,
+        delivery_data: Optional[dict] = None,
+        session: Optional[AsyncSession] = None
+    ) -> bool:
+        """Complete an order and handle delivery, optionally within the caller's session."""
+        async with session_scope(session) as session:
             order = await session.get(Order, order_id)
-            if not order or order.status != OrderStatus.PENDING.value:
+            if not order or not order.is_awaiting_payment:
                 return False
             
-            # Update product stock
-            success = await ProductService.decrease_stock(order.product_id, order.quantity)
+            # Update product stock in the same transaction as the order status
+            success = await ProductService.decrease_stock(order.product_id, order.quantity, session)
             if not success:
                 logger.error(f"Failed to decrease stock for order {order.order_number}")
                 return False
@@ -169,182 +317,171 @@ class OrderService:
             if delivery_data:
                 order.delivery_data = delivery_data
             
-            await session.commit()
-            
-            logger.info(f"Completed order: {order.order_number}")
-            return True
+            await session.flush()
+            after_commit(session, partial(_order_closed, order_id))
+        
+        logger.info(f"Completed order: {order.order_number}")
+        return True
     
     @staticmethod
-    async def cancel_order(order_id: int, reason: Optional[str] = None) -> bool:
-        """Cancel an order."""
-        async with get_session() as session:
+    async def cancel_order(
+        order_id: int,
+        reason: Optional[str] = None,
+        session: Optional[AsyncSession] = None,
+        pending_only: bool = False
+    ) -> bool:
+        """Cancel an order, optionally within the caller's session.
+        
+        pending_only refuses orders whose payment has already been started.
+        """
+        async with session_scope(session) as session:
             order = await session.get(Order, order_id)
-            if not order or order.status not in [OrderStatus.PENDING.value, OrderStatus.PROCESSING.value]:
+            if not order or not order.is_awaiting_payment:
+                return False
+            if pending_only and not order.is_pending:
                 return False
             
             order.mark_as_cancelled()
-            await session.commit()
-            
-            logger.info(f"Cancelled order: {order.order_number} - {reason}")
-            return True
+            await session.flush()
+            after_commit(session, partial(_order_closed, order_id))
+        
+        logger.info(f"Cancelled order: {order.order_number} - {reason}")
+        return True
     
     @staticmethod
     async def expire_pending_orders() -> int:
-        """Expire old pending orders."""
+        """Expire old pending orders with a single UPDATE."""
+        query = (
+            update(Order)
+            .where(Order.is_pending, Order.expires_at < utcnow())
+            .values(status=OrderStatus.CANCELLED.value)
+            .execution_options(synchronize_session=False)
+        )
+        
         async with get_session() as session:
-            now = datetime.now()
-            
-            # Find expired pending orders
-            query = select(Order).where(
-                Order.status == OrderStatus.PENDING.value,
-                Order.expires_at < now
-            )
             result = await session.execute(query)
-            expired_orders = list(result.scalars().all())
-            
-            # Cancel expired orders
-            cancelled_count = 0
-            for order in expired_orders:
-                order.mark_as_cancelled()
-                cancelled_count += 1
-            
-            if cancelled_count > 0:
-                await session.commit()
-                logger.info(f"Expired {cancelled_count} pending orders")
-            
-            return cancelled_count
+            await session.commit()
+        
+        cancelled_count = result.rowcount
+        if cancelled_count > 0:
+            await invalidate_order_stats()
+            logger.info(f"Expired {cancelled_count} pending orders")
+        
+        return cancelled_count
     
     @staticmethod
     async def get_order_stats() -> OrderStats:
-        """Get order statistics."""
+        """Get order statistics with one aggregate query."""
+        day_start, day_end = utc_day_bounds()
+        completed = Order.status == OrderStatus.COMPLETED.value
+        
+        query = select(
+            func.count().label("total"),
+            func.count().filter(Order.status == OrderStatus.PENDING.value).label("pending"),
+            func.count().filter(completed).label("completed"),
+            func.count().filter(Order.status == OrderStatus.CANCELLED.value).label("cancelled"),
+            func.sum(Order.total_price).filter(
+                completed, Order.created_at >= day_start, Order.created_at < day_end
+            ).label("revenue_today"),
+            func.sum(Order.total_price).filter(completed).label("revenue_total"),
+        )
+        
         async with get_session() as session:
-            # Total orders
-            total_query = select(func.count(Order.id))
-            total_result = await session.execute(total_query)
-            total_orders = total_result.scalar() or 0
-            
-            # Pending orders
-            pending_query = select(func.count(Order.id)).where(
-                Order.status == OrderStatus.PENDING.value
-            )
-            pending_result = await session.execute(pending_query)
-            pending_orders = pending_result.scalar() or 0
-            
-            # Completed orders
-            completed_query = select(func.count(Order.id)).where(
-                Order.status == OrderStatus.COMPLETED.value
-            )
-            completed_result = await session.execute(completed_query)
-            completed_orders = completed_result.scalar() or 0
-            
-            # Cancelled orders
-            cancelled_query = select(func.count(Order.id)).where(
-                Order.status == OrderStatus.CANCELLED.value
-            )
-            cancelled_result = await session.execute(cancelled_query)
-            cancelled_orders = cancelled_result.scalar() or 0
-            
-            # Revenue today
-            today = datetime.now().date()
-            revenue_today_query = select(func.sum(Order.total_price)).where(
-                Order.status == OrderStatus.COMPLETED.value,
-                func.date(Order.created_at) == today
-            )
-            revenue_today_result = await session.execute(revenue_today_query)
-            revenue_today = Decimal(str(revenue_today_result.scalar() or 0))
-            
-            # Total revenue
-            revenue_total_query = select(func.sum(Order.total_price)).where(
-                Order.status == OrderStatus.COMPLETED.value
-            )
-            revenue_total_result = await session.execute(revenue_total_query)
-            revenue_total = Decimal(str(revenue_total_result.scalar() or 0))
-            
-            return OrderStats(
-                total_orders=total_orders,
-                pending_orders=pending_orders,
-                completed_orders=completed_orders,
-                cancelled_orders=cancelled_orders,
-                revenue_today=revenue_today,
-                revenue_total=revenue_total
-            )
+            row = (await session.execute(query)).one()
+        
+        return OrderStats(
+            total_orders=row.total,
+            pending_orders=row.pending,
+            completed_orders=row.completed,
+            cancelled_orders=row.cancelled,
+            revenue_today=Decimal(str(row.revenue_today or 0)),
+            revenue_total=Decimal(str(row.revenue_total or 0))
+        )
     
     @staticmethod
-    async def generate_delivery_message(order: Order) -> Optional[str]:
+    async def generate_delivery_message(
+        order: Order,
+        session: Optional[AsyncSession] = None
+    ) -> Optional[str]:
         """Generate delivery message for completed order."""
-        async with get_session() as session:
-            # Get product with delivery config
-            product = await session.get(Product, order.product_id)
-            if not product or not product.delivery_config:
-                return None
-            
-            delivery_config = product.delivery_config
-            template = delivery_config.get('template', '')
-            
-            if not template:
-                return f"✅ Your order #{order.order_number} has been completed!"
-            
-            # Replace variables in template
-            variables = {
-                'order_number': order.order_number,
-                'product_name': product.name,
-                'quantity': order.quantity,
-                'user_id': order.user_id
-            }
-            
-            # Add delivery data variables if available
-            if order.delivery_data:
-                variables.update(order.delivery_data)
-            
-            try:
-                message = template.format(**variables)
-                return message
-            except KeyError as e:
-                logger.error(f"Missing variable in delivery template: {e}")
-                return f"✅ Your order #{order.order_number} has been completed!"
+        # Only the columns the message needs; no Product instance is built
+        query = select(Product.name, Product.delivery_config).where(Product.id == order.product_id)
+        async with session_scope(session) as session:
+            row = (await session.execute(query)).one_or_none()
+        
+        if not row or not row.delivery_config:
+            return None
+        
+        template = row.delivery_config.get('template', '')
+        
+        if not template:
+            return f"✅ Your order #{order.order_number} has been completed!"
+        
+        # Replace variables in template
+        variables = {
+            'order_number': order.order_number,
+            'product_name': row.name,
+            'quantity': order.quantity,
+            'user_id': order.user_id
+        }
+        
+        # Add delivery data variables if available
+        if order.delivery_data:
+            variables.update(order.delivery_data)
+        
+        try:
+            return template.format_map(variables)
+        except KeyError as e:
+            logger.error(f"Missing variable in delivery template: {e}")
+            return f"✅ Your order #{order.order_number} has been completed!"
     
     @staticmethod
     async def get_user_order_stats(user_id: int) -> dict:
-        """Get order statistics for a specific user."""
+        """Get order statistics for a specific user with one aggregate query."""
+        completed = Order.status == OrderStatus.COMPLETED.value
+        
+        query = select(
+            func.count().label("total"),
+            func.count().filter(completed).label("completed"),
+            func.count().filter(Order.status == OrderStatus.PENDING.value).label("pending"),
+            func.sum(Order.total_price).filter(completed).label("spent"),
+        ).where(Order.user_id == user_id)
+        
         async with get_session() as session:
-            # Total orders for user
-            total_query = select(func.count(Order.id)).where(Order.user_id == user_id)
-            total_result = await session.execute(total_query)
-            total_orders = total_result.scalar() or 0
-            
-            # Completed orders
-            completed_query = select(func.count(Order.id)).where(
-                Order.user_id == user_id,
-                Order.status == OrderStatus.COMPLETED.value
-            )
-            completed_result = await session.execute(completed_query)
-            completed_orders = completed_result.scalar() or 0
-            
-            # Pending orders
-            pending_query = select(func.count(Order.id)).where(
-                Order.user_id == user_id,
-                Order.status == OrderStatus.PENDING.value
-            )
-            pending_result = await session.execute(pending_query)
-            pending_orders = pending_result.scalar() or 0
-            
+            row = (await session.execute(query)).one()
+        
+        return {
+            'total_orders': row.total,
+            'completed_orders': row.completed,
+            'pending_orders': row.pending,
             # Total spent (completed orders only)
-            spent_query = select(func.sum(Order.total_price)).where(
-                Order.user_id == user_id,
-                Order.status == OrderStatus.COMPLETED.value
-            )
-            spent_result = await session.execute(spent_query)
-            total_spent = float(spent_result.scalar() or 0)
-            
-            return {
-                'total_orders': total_orders,
-                'completed_orders': completed_orders,
-                'pending_orders': pending_orders,
-                'total_spent': total_spent
-            }
+            'total_spent': float(row.spent or 0)
+        }
+    
+    @staticmethod
+    async def _insert_order(session: AsyncSession, order: Order) -> None:
+        """Insert order, relying on the unique index to catch a duplicate order number.
+        
+        The insert runs in a savepoint so a collision only retries the insert
+        and keeps the rest of the transaction (including row locks).
+        """
+        for attempt in range(2):
+            try:
+                async with session.begin_nested():
+                    session.add(order)
+                return
+            except IntegrityError:
+                if attempt:
+                    raise
+                logger.warning(f"Order number collision: {order.order_number}, retrying")
+                order.order_number = OrderService._generate_order_number()
     
     @staticmethod
-    def _generate_order_number(length: int = 8) -> str:
-        """Generate a random order number."""
-        chars = string.ascii_uppercase + string.digits
-        return ''.join(secrets.choice(chars) for _ in range(length))
\ No newline at end of file
+    def _generate_order_number() -> str:
+        """Generate a short, time-ordered order number."""
+        value = time.time_ns() // 1_000_000 * 1296 + next(_order_sequence) % 1296
+        digits = []
+        while value:
+            value, remainder = divmod(value, 36)
+            digits.append(_ORDER_NUMBER_ALPHABET[remainder])
+        return ''.join(reversed(digits))
\ No newline at end of file
@@ -1,36 +1,84 @@
 """Payment service for handling different payment gateways."""
+import hashlib
+import hmac
+import json
 import logging
-from datetime import datetime
 from typing import Dict, Optional
 
+import httpx
+
+from app.cache.backend import cache_get, cache_set
+from app.cache.payment_cache import payment_key
 from app.models.order import Order, OrderStatus, PaymentGateway
-from app.schemas.order import PaymentRequest, PaymentResponse
+from app.schemas.order import OrderUpdate, PaymentRequest, PaymentResponse
 from app.services.order_service import OrderService
 from app.config import settings
+from app.utils.helpers import as_utc, utcnow
 
 logger = logging.getLogger(__name__)
 
+# Payment cache lifetime for orders without an expiry time
+PAYMENT_CACHE_TTL = 900
+
 
 class PaymentService:
     """Service for payment processing."""
     
     @staticmethod
     async def create_payment(payment_request: PaymentRequest) -> Optional[PaymentResponse]:
-        """Create payment for an order."""
+        """Create payment for an order.
+        
+        Responses are cached until the order expires, so repeated clicks on
+        the pay button reuse the payment instead of calling the gateway again.
+        """
         order = await OrderService.get_by_id(payment_request.order_id)
-        if not order or not order.is_pending:
+        if not order or not order.is_awaiting_payment:
             logger.warning(f"Invalid order for payment: {payment_request.order_id}")
             return None
         
         gateway = payment_request.payment_gateway.lower()
+        key = payment_key(gateway, order.id)
         
-        if gateway == PaymentGateway.TELEGRAM_STARS.value:
-            return await PaymentService._create_telegram_stars_payment(order)
+        cached = await cache_get(key)
+        if cached is not None:
+            return PaymentResponse.model_validate_json(cached)
+        
+        if not order.is_pending:
+            # Cache entry was lost; rebuild the response from the stored payment
+            response = PaymentService._restore_payment(order, gateway)
+            if not response:
+                logger.warning(f"Payment already started for order: {order.id}")
+                return None
+        elif gateway == PaymentGateway.TELEGRAM_STARS.value:
+            response = await PaymentService._create_telegram_stars_payment(order)
         elif gateway == PaymentGateway.CRYPTOMUS.value:
-            return await PaymentService._create_cryptomus_payment(order)
+            response = await PaymentService._create_cryptomus_payment(order)
         else:
             logger.error(f"Unsupported payment gateway: {gateway}")
             return None
+        
+        if response:
+            ttl = PAYMENT_CACHE_TTL
+            if order.expires_at:
+                ttl = int((as_utc(order.expires_at) - utcnow()).total_seconds())
+            if ttl > 0:
+                await cache_set(key, response.model_dump_json(), ttl)
+        
+        return response
+    
+    @staticmethod
+    def _restore_payment(order: Order, gateway: str) -> Optional[PaymentResponse]:
+        """Rebuild payment response from payment info saved on the order."""
+        if not order.payment_id or order.payment_gateway != gateway:
+            return None
+        
+        payment_data = order.payment_data or {}
+        return PaymentResponse(
+            payment_id=order.payment_id,
+            payment_url=payment_data.get("url"),
+            qr_code=payment_data.get("qr_code"),
+            expires_at=order.expires_at
+        )
     
     @staticmethod
     async def handle_payment_callback(
@@ -60,11 +108,11 @@ class PaymentService:
             payment_id = f"stars_{order.order_number}"
             
             # Update order with payment info
-            await OrderService.update_order(order.id, {
-                "payment_gateway": PaymentGateway.TELEGRAM_STARS.value,
-                "payment_id": payment_id,
-                "status": OrderStatus.PROCESSING.value
-            })
+            await OrderService.update_order(order.id, OrderUpdate(
+                payment_gateway=PaymentGateway.TELEGRAM_STARS.value,
+                payment_id=payment_id,
+                status=OrderStatus.PROCESSING.value
+            ))
             
             return PaymentResponse(
                 payment_id=payment_id,
@@ -85,8 +133,6 @@ class PaymentService:
             return None
         
         try:
-            import httpx
-            
             # Cryptomus API endpoint
             url = "https://api.cryptomus.com/v1/payment"
             
@@ -114,12 +160,12 @@ class PaymentService:
                     payment_url = result.get("url")
                     
                     # Update order with payment info
-                    await OrderService.update_order(order.id, {
-                        "payment_gateway": PaymentGateway.CRYPTOMUS.value,
-                        "payment_id": payment_id,
-                        "status": OrderStatus.PROCESSING.value,
-                        "payment_data": result
-                    })
+                    await OrderService.update_order(order.id, OrderUpdate(
+                        payment_gateway=PaymentGateway.CRYPTOMUS.value,
+                        payment_id=payment_id,
+                        status=OrderStatus.PROCESSING.value,
+                        payment_data=result
+                    ))
                     
                     return PaymentResponse(
                         payment_id=payment_id,
@@ -167,10 +213,7 @@ class PaymentService:
     async def _handle_cryptomus_callback(payment_id: str, callback_data: Dict) -> bool:
         """Handle Cryptomus payment callback."""
         try:
-            # Verify callback signature
-            if not PaymentService._verify_cryptomus_callback(callback_data):
-                logger.error("Invalid Cryptomus callback signature")
-                return False
+            # Signature is verified by the webhook before dispatching here
             
             # Find order by payment_id
             order = None
@@ -188,7 +231,13 @@ class PaymentService:
             status = callback_data.get("status")
             if status == "paid":
                 # Payment successful
-                await OrderService.complete_order(order.id)
+                if not await OrderService.complete_order(order.id):
+                    # Money was taken but nothing is delivered; needs manual handling
+                    logger.error(
+                        f"Cryptomus payment {payment_id} could not complete "
+                        f"order {order.order_number} (status: {order.status})"
+                    )
+                    return False
                 logger.info(f"Cryptomus payment completed: {payment_id}")
                 return True
             elif status in ["failed", "cancelled", "expired"]:
@@ -208,9 +257,6 @@ class PaymentService:
     @staticmethod
     def _generate_cryptomus_signature(data: Dict) -> str:
         """Generate signature for Cryptomus API request."""
-        import hashlib
-        import json
-        
         # Sort data and create string
         sorted_data = json.dumps(data, sort_keys=True, separators=(',', ':'))
         
@@ -221,23 +267,13 @@ class PaymentService:
         return signature
     
     @staticmethod
-    def _verify_cryptomus_callback(callback_data: Dict) -> bool:
+    def verify_cryptomus_signature(payload: Dict) -> bool:
         """Verify Cryptomus callback signature."""
-        try:
-            import hashlib
-            import json
-            
-            received_signature = callback_data.pop("sign", "")
-            if not received_signature:
-                return False
-            
-            # Generate expected signature
-            sorted_data = json.dumps(callback_data, sort_keys=True, separators=(',', ':'))
-            signature_string = sorted_data + settings.cryptomus_api_key
-            expected_signature = hashlib.md5(signature_string.encode()).hexdigest()
-            
-            return received_signature == expected_signature
-            
-        except Exception as e:
-            logger.error(f"Error verifying Cryptomus callback: {e}")
-            return False
\ No newline at end of file
+        received_signature = payload.get("sign")
+        if not received_signature or not settings.cryptomus_api_key:
+            return False
+        
+        data = {key: value for key, value in payload.items() if key != "sign"}
+        expected_signature = PaymentService._generate_cryptomus_signature(data)
+        
+        return hmac.compare_digest(str(received_signature), expected_signature)
\ No newline at end of file
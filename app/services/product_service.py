@@ -1,29 +1,103 @@
 """Product service for managing products and catalog."""
-import json
+import asyncio
 import logging
 from decimal import Decimal
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import func, select
+import orjson
+from sqlalchemy import func, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_session
+from app.cache.memory import TTLCache
+from app.cache.catalog_cache import (
+    CATEGORIES_KEY, FEATURED_KEY, cached_catalog, category_key, invalidate_catalog
+)
+from app.cache.stats_cache import invalidate_product_stats
+from app.database import after_commit, get_session, session_scope
 from app.models.product import Product, ProductCategory
 from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse, ProductStats
 from app.config import settings
+from app.utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# Rows per INSERT statement when loading products
+LOAD_CHUNK_SIZE = 500
+
+# Featured products shown on the single featured page
+FEATURED_LIMIT = 5
+
+_get_by_id_flight = SingleFlight()
+
+# Hot product rows kept in-process so repeated detail views skip the DB
+_hot_products = TTLCache(maxsize=256, ttl=60)
+
+# Bumped on every product write; loads started under an older generation are not cached
+_product_generation: Dict[int, int] = {}
+
+
+def _forget_product(product_id: int) -> None:
+    """Drop a product from the hot cache and outdate loads already in flight."""
+    _product_generation[product_id] = _product_generation.get(product_id, 0) + 1
+    _hot_products.delete(product_id)
+
+
+async def _stock_changed(product_id: int, sold_out: bool) -> None:
+    """Drop cached views of a product's stock."""
+    _forget_product(product_id)
+    if sold_out:
+        await invalidate_catalog()
+    await invalidate_product_stats()
+
+
+@lru_cache(maxsize=4)
+def _parse_json_file(path: str, mtime_ns: int) -> Dict[str, Any]:
+    """Parse JSON file; cached until the file is modified."""
+    return orjson.loads(Path(path).read_bytes())
+
+
+def _read_json_file(file_path: Path) -> Dict[str, Any]:
+    """Read and parse JSON file, reusing the parsed result while it is unchanged."""
+    return _parse_json_file(str(file_path), file_path.stat().st_mtime_ns)
+
+
+def _catalog_entries(products: List[Product]) -> List[Dict[str, Any]]:
+    """Reduce products to the fields shown in catalog listings."""
+    return [
+        {
+            'id': product.id,
+            'name': product.name,
+            'formatted_price': product.formatted_price
+        }
+        for product in products
+    ]
+
 
 class ProductService:
     """Service for product management."""
     
     @staticmethod
     async def get_by_id(product_id: int) -> Optional[Product]:
-        """Get product by ID."""
+        """Get product by ID; concurrent lookups of one ID share a query."""
+        product = _hot_products.get(product_id)
+        if product is not None:
+            return product
+        
+        product, generation = await _get_by_id_flight.do(
+            product_id, lambda: ProductService._load_by_id(product_id)
+        )
+        if product is not None and generation == _product_generation.get(product_id, 0):
+            _hot_products.set(product_id, product)
+        return product
+    
+    @staticmethod
+    async def _load_by_id(product_id: int) -> Tuple[Optional[Product], int]:
+        """Load product by ID with the write generation it was read under."""
+        generation = _product_generation.get(product_id, 0)
         async with get_session() as session:
-            return await session.get(Product, product_id)
+            return await session.get(Product, product_id), generation
     
     @staticmethod
     async def get_by_slug(slug: str) -> Optional[Product]:
@@ -39,11 +113,19 @@ class ProductService:
         is_active: Optional[bool] = None,
         is_featured: Optional[bool] = None,
         limit: Optional[int] = None,
-        offset: int = 0
+        offset: int = 0,
+        after_id: Optional[int] = None
     ) -> List[Product]:
-        """Get all products with optional filters."""
+        """Get all products with optional filters.
+        
+        When after_id is given, products are returned in id order starting
+        after that id (keyset pagination) and offset is ignored.
+        """
         async with get_session() as session:
-            query = select(Product).order_by(Product.sort_order, Product.created_at)
+            if after_id is not None:
+                query = select(Product).where(Product.id > after_id).order_by(Product.id)
+            else:
+                query = select(Product).order_by(Product.sort_order, Product.created_at)
             
             if category:
                 query = query.where(Product.category == category)
@@ -54,32 +136,51 @@ class ProductService:
                 
             if limit:
                 query = query.limit(limit)
-            if offset:
+            if offset and after_id is None:
                 query = query.offset(offset)
             
             result = await session.execute(query)
             return list(result.scalars().all())
     
     @staticmethod
-    async def get_available_products(category: Optional[str] = None) -> List[Product]:
-        """Get available products (active and in stock)."""
+    async def get_available_products(
+        category: Optional[str] = None,
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[Product]:
+        """Get available products (active and in stock).
+        
+        With after_id or before_id, products are returned in id order from
+        that cursor onwards or backwards (keyset pagination).
+        """
         async with get_session() as session:
-            query = select(Product).where(Product.is_active == True)
+            query = select(Product).where(Product.available_criteria())
             
             if category:
                 query = query.where(Product.category == category)
             
-            query = query.order_by(Product.sort_order, Product.created_at)
+            if before_id is not None:
+                query = query.where(Product.id < before_id).order_by(Product.id.desc())
+            elif after_id is not None:
+                query = query.where(Product.id > after_id).order_by(Product.id)
+            else:
+                query = query.order_by(Product.sort_order, Product.created_at)
+            
+            if limit:
+                query = query.limit(limit)
+            
             result = await session.execute(query)
             products = list(result.scalars().all())
             
-            # Filter by stock availability
-            return [p for p in products if p.is_in_stock]
+            if before_id is not None:
+                products.reverse()
+            return products
     
     @staticmethod
-    async def get_featured_products() -> List[Product]:
-        """Get all featured products."""
-        return await ProductService.get_all_products(is_featured=True, is_active=True)
+    async def get_featured_products(limit: Optional[int] = None) -> List[Product]:
+        """Get featured products."""
+        return await ProductService.get_all_products(is_featured=True, is_active=True, limit=limit)
     
     @staticmethod
     async def get_categories() -> List[str]:
@@ -89,6 +190,59 @@ class ProductService:
             result = await session.execute(query)
             return list(result.scalars().all())
     
+    @staticmethod
+    async def get_catalog_categories() -> List[str]:
+        """Get active product categories (cached)."""
+        return await cached_catalog(
+            CATEGORIES_KEY, settings.catalog_cache_ttl, ProductService.get_categories
+        )
+    
+    @staticmethod
+    async def get_featured_catalog() -> List[Dict[str, Any]]:
+        """Get featured products as catalog entries (cached)."""
+        async def load() -> List[Dict[str, Any]]:
+            return _catalog_entries(await ProductService.get_featured_products(FEATURED_LIMIT))
+        
+        return await cached_catalog(FEATURED_KEY, settings.catalog_cache_ttl, load)
+    
+    @staticmethod
+    async def get_category_page(
+        category: str,
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+        limit: int = 5
+    ) -> Dict[str, Any]:
+        """Get a page of available products in a category (cached).
+        
+        Returns catalog entries plus has_prev/has_next flags. One extra row
+        is fetched to tell whether another page exists, without a COUNT.
+        """
+        async def load() -> Dict[str, Any]:
+            products = await ProductService.get_available_products(
+                category=category,
+                after_id=(after_id or 0) if before_id is None else None,
+                before_id=before_id,
+                limit=limit + 1
+            )
+            if before_id is not None:
+                has_prev = len(products) > limit
+                has_next = True
+                products = products[-limit:]
+            else:
+                has_prev = bool(after_id)
+                has_next = len(products) > limit
+                products = products[:limit]
+            
+            return {
+                'products': _catalog_entries(products),
+                'has_prev': has_prev,
+                'has_next': has_next
+            }
+        
+        cursor = f"<{before_id}" if before_id is not None else f">{after_id or 0}"
+        key = category_key(category, f"{limit}:{cursor}")
+        return await cached_catalog(key, settings.catalog_cache_ttl, load)
+    
     @staticmethod
     async def create_product(product_data: ProductCreate) -> Product:
         """Create a new product."""
@@ -97,6 +251,8 @@ class ProductService:
             session.add(product)
             await session.commit()
             await session.refresh(product)
+            await invalidate_catalog()
+            await invalidate_product_stats()
             
             logger.info(f"Created product: {product.name} (ID: {product.id})")
             return product
@@ -115,6 +271,9 @@ class ProductService:
             
             await session.commit()
             await session.refresh(product)
+            _forget_product(product_id)
+            await invalidate_catalog()
+            await invalidate_product_stats()
             
             logger.info(f"Updated product: {product.name}")
             return product
@@ -129,24 +288,34 @@ class ProductService:
             
             product.is_active = False
             await session.commit()
+            _forget_product(product_id)
+            await invalidate_catalog()
+            await invalidate_product_stats()
             
             logger.info(f"Deleted product: {product.name}")
             return True
     
     @staticmethod
-    async def decrease_stock(product_id: int, quantity: int = 1) -> bool:
-        """Decrease product stock."""
-        async with get_session() as session:
+    async def decrease_stock(
+        product_id: int,
+        quantity: int = 1,
+        session: Optional[AsyncSession] = None
+    ) -> bool:
+        """Decrease product stock, optionally within the caller's session."""
+        async with session_scope(session) as session:
             product = await session.get(Product, product_id)
             if not product:
                 return False
             
-            if product.decrease_stock(quantity):
-                await session.commit()
-                logger.info(f"Decreased stock for {product.name}: -{quantity}")
-                return True
+            if not product.decrease_stock(quantity):
+                return False
             
-            return False
+            await session.flush()
+            # A caller's session may not commit until well after this returns
+            after_commit(session, partial(_stock_changed, product_id, not product.is_in_stock))
+        
+        logger.info(f"Decreased stock for {product.name}: -{quantity}")
+        return True
     
     @staticmethod
     async def get_product_stats() -> ProductStats:
@@ -201,25 +370,41 @@ class ProductService:
             return 0
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
+            # Read and parse off the event loop
+            data = await asyncio.to_thread(_read_json_file, file_path)
             products_data = data.get('products', [])
-            loaded_count = 0
             
-            for product_data in products_data:
-                # Check if product already exists
-                existing = await ProductService.get_by_slug(product_data.get('slug'))
-                if existing:
-                    continue
+            async with get_session() as session:
+                result = await session.execute(select(Product.slug, Product.name))
+                existing = result.all()
+                seen_slugs = {slug for slug, _ in existing if slug}
+                seen_names = {name for slug, name in existing if not slug}
                 
-                # Create product
-                product_create = ProductCreate(**product_data)
-                await ProductService.create_product(product_create)
-                loaded_count += 1
+                rows = []
+                for product_data in products_data:
+                    product_create = ProductCreate(**product_data)
+                    
+                    # Skip products that already exist
+                    if product_create.slug:
+                        if product_create.slug in seen_slugs:
+                            continue
+                        seen_slugs.add(product_create.slug)
+                    else:
+                        if product_create.name in seen_names:
+                            continue
+                        seen_names.add(product_create.name)
+                    
+                    rows.append(product_create.model_dump())
+                
+                for i in range(0, len(rows), LOAD_CHUNK_SIZE):
+                    await session.execute(insert(Product), rows[i:i + LOAD_CHUNK_SIZE])
+            
+            if rows:
+                await invalidate_catalog()
+                await invalidate_product_stats()
             
-            logger.info(f"Loaded {loaded_count} products from {file_path}")
-            return loaded_count
+            logger.info(f"Loaded {len(rows)} products from {file_path}")
+            return len(rows)
             
         except Exception as e:
             logger.error(f"Failed to load products from {file_path}: {e}")
@@ -257,8 +442,8 @@ class ProductService:
                 }
                 export_data["products"].append(product_data)
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, indent=2, ensure_ascii=False)
+            content = orjson.dumps(export_data, option=orjson.OPT_INDENT_2)
+            await asyncio.to_thread(file_path.write_bytes, content)
             
             logger.info(f"Exported {len(products)} products to {file_path}")
             return True
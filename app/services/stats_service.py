@@ -0,0 +1,98 @@
+"""Statistics service for the admin dashboard."""
+import logging
+from decimal import Decimal
+
+from sqlalchemy import func, select
+
+from app.database import get_session
+from app.models.order import Order, OrderStatus
+from app.models.product import Product
+from app.models.user import User
+from app.schemas.order import OrderStats
+from app.schemas.product import ProductStats
+from app.schemas.stats import AdminStats
+from app.schemas.user import UserStats
+from app.utils.helpers import utc_day_bounds
+
+logger = logging.getLogger(__name__)
+
+
+class StatsService:
+    """Service for aggregated statistics."""
+    
+    @staticmethod
+    async def get_combined_stats() -> AdminStats:
+        """Get user, product and order statistics in a single query."""
+        day_start, day_end = utc_day_bounds()
+        
+        def count(column, *criteria):
+            return select(func.count(column)).where(*criteria).scalar_subquery()
+        
+        def total(expr, *criteria):
+            return select(func.coalesce(func.sum(expr), 0)).where(*criteria).scalar_subquery()
+        
+        query = select(
+            # Users
+            count(User.id).label("total_users"),
+            count(User.id, User.is_active == True).label("active_users"),
+            count(User.id, User.trial_used == True).label("trial_users"),
+            count(User.id, User.is_admin == True).label("admin_users"),
+            count(
+                User.id, User.created_at >= day_start, User.created_at < day_end
+            ).label("new_users_today"),
+            # Products
+            count(Product.id).label("total_products"),
+            count(Product.id, Product.is_active == True).label("active_products"),
+            count(
+                Product.id,
+                Product.stock_count.is_not(None),
+                Product.stock_count <= 0,
+                Product.is_active == True
+            ).label("out_of_stock"),
+            total(Product.sold_count).label("total_sales"),
+            total(Product.price * Product.sold_count).label("product_revenue"),
+            # Orders
+            count(Order.id).label("total_orders"),
+            count(Order.id, Order.status == OrderStatus.PENDING.value).label("pending_orders"),
+            count(Order.id, Order.status == OrderStatus.COMPLETED.value).label("completed_orders"),
+            count(Order.id, Order.status == OrderStatus.CANCELLED.value).label("cancelled_orders"),
+            total(
+                Order.total_price,
+                Order.status == OrderStatus.COMPLETED.value,
+                Order.created_at >= day_start,
+                Order.created_at < day_end
+            ).label("revenue_today"),
+            total(
+                Order.total_price,
+                Order.status == OrderStatus.COMPLETED.value
+            ).label("revenue_total"),
+        )
+        
+        async with get_session() as session:
+            result = await session.execute(query)
+            row = result.one()
+        
+        return AdminStats(
+            users=UserStats(
+                total_users=row.total_users,
+                active_users=row.active_users,
+                trial_users=row.trial_users,
+                admin_users=row.admin_users,
+                new_users_today=row.new_users_today
+            ),
+            products=ProductStats(
+                total_products=row.total_products,
+                active_products=row.active_products,
+                out_of_stock=row.out_of_stock,
+                total_sales=row.total_sales,
+                revenue_today=Decimal(str(row.product_revenue))
+            ),
+            orders=OrderStats(
+                total_orders=row.total_orders,
+                pending_orders=row.pending_orders,
+                completed_orders=row.completed_orders,
+                cancelled_orders=row.cancelled_orders,
+                revenue_today=Decimal(str(row.revenue_today)),
+                revenue_total=Decimal(str(row.revenue_total))
+            )
+        )
@@ -3,19 +3,34 @@ import logging
 import secrets
 import string
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, FrozenSet, Optional, Tuple
 
-from sqlalchemy import func, select
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.cache.memory import TTLCache
+from app.cache.stats_cache import invalidate_user_stats
 from app.database import get_session
 from app.models.user import User
 from app.models.referral import Referral, ReferralStatus
 from app.schemas.user import UserCreate, UserUpdate, UserResponse, UserStats
 from app.config import settings
+from app.utils.helpers import utc_day_bounds, utcnow
 
 logger = logging.getLogger(__name__)
 
+# Users seen by the bot, keyed by Telegram ID
+_user_cache = TTLCache(maxsize=10000, ttl=settings.user_cache_ttl)
+
+# Telegram IDs with activity not yet written to the database
+_pending_activity: Dict[int, datetime] = {}
+
+# Banned Telegram IDs, reloaded periodically by the scheduler
+_banned_ids: FrozenSet[int] = frozenset()
+
 
 class UserService:
     """Service for user management."""
@@ -28,6 +43,89 @@ class UserService:
             result = await session.execute(query)
             return result.scalar_one_or_none()
     
+    @staticmethod
+    def get_cached_user(telegram_id: int) -> Optional[User]:
+        """Get user from the short-lived in-process cache, without a query."""
+        return _user_cache.get(telegram_id)
+    
+    @staticmethod
+    async def touch_user(
+        user_data: UserCreate, referrer_code: Optional[str] = None
+    ) -> Tuple[User, bool]:
+        """Insert user or refresh its last activity in one UPSERT.
+        
+        Returns the user and whether it was just created. New users are
+        linked to the referrer owning referrer_code, if any.
+        """
+        now = utcnow()
+        
+        async with get_session() as session:
+            dialect_insert = (
+                pg_insert if session.bind.dialect.name == "postgresql" else sqlite_insert
+            )
+            # The conflict target is telegram_id, so a clashing referral code
+            # still raises; retry it with a fresh code
+            for attempt in range(2):
+                referral_code = UserService._generate_referral_code()
+                query = (
+                    dialect_insert(User)
+                    .values(
+                        telegram_id=user_data.telegram_id,
+                        username=user_data.username,
+                        first_name=user_data.first_name,
+                        last_name=user_data.last_name,
+                        language_code=user_data.language_code or "en",
+                        referral_code=referral_code,
+                        last_activity=now
+                    )
+                    .on_conflict_do_update(
+                        index_elements=[User.telegram_id],
+                        set_={"last_activity": now}
+                    )
+                    .returning(User)
+                    .execution_options(populate_existing=True)
+                )
+                try:
+                    async with session.begin_nested():
+                        user = (await session.execute(query)).scalar_one()
+                    break
+                except IntegrityError:
+                    if attempt:
+                        raise
+                    logger.warning(f"Referral code collision: {referral_code}, retrying")
+            
+            # An existing row keeps its own referral code
+            created = user.referral_code == referral_code
+            if created and referrer_code:
+                await UserService._link_referrer(session, user, referrer_code)
+            
+            await session.commit()
+        
+        _user_cache.set(user.telegram_id, user)
+        if created:
+            logger.info(f"Created new user: {user.telegram_id} (ID: {user.id})")
+        return user, created
+    
+    @staticmethod
+    async def _link_referrer(session: AsyncSession, user: User, referrer_code: str) -> None:
+        """Attach a new user to the referrer owning referrer_code."""
+        result = await session.execute(
+            select(User).where(User.referral_code == referrer_code)
+        )
+        referrer = result.scalar_one_or_none()
+        if not referrer or referrer.id == user.id:
+            return
+        
+        user.referrer_id = referrer.id
+        session.add(Referral(
+            referrer_id=referrer.id,
+            referred_id=user.id,
+            referral_code=referrer_code,
+            status=ReferralStatus.ACTIVE.value
+        ))
+        referrer.total_referred += 1
+        _user_cache.delete(referrer.telegram_id)
+    
     @staticmethod
     async def get_by_id(user_id: int) -> Optional[User]:
         """Get user by ID."""
@@ -74,7 +172,7 @@ class UserService:
                 language_code=user_data.language_code or "en",
                 referral_code=referral_code,
                 referrer_id=referrer_id,
-                last_activity=datetime.now()
+                last_activity=utcnow()
             )
             
             session.add(user)
@@ -94,6 +192,7 @@ class UserService:
                 referrer = await session.get(User, referrer_id)
                 if referrer:
                     referrer.total_referred += 1
+                    _user_cache.delete(referrer.telegram_id)
             
             await session.commit()
             await session.refresh(user)
@@ -113,9 +212,10 @@ class UserService:
             for field, value in update_data.items():
                 setattr(user, field, value)
             
-            user.updated_at = datetime.now()
+            user.updated_at = utcnow()
             await session.commit()
             await session.refresh(user)
+            _user_cache.delete(user.telegram_id)
             
             logger.info(f"Updated user: {user.telegram_id}")
             return user
@@ -129,9 +229,63 @@ class UserService:
             user = result.scalar_one_or_none()
             
             if user:
-                user.last_activity = datetime.now()
+                user.last_activity = utcnow()
                 await session.commit()
     
+    @staticmethod
+    def is_banned(telegram_id: int) -> bool:
+        """Check Telegram ID against the in-memory banned set, without a query."""
+        return telegram_id in _banned_ids
+    
+    @staticmethod
+    async def refresh_banned_ids() -> int:
+        """Reload the in-memory set of banned Telegram IDs."""
+        global _banned_ids
+        
+        async with get_session() as session:
+            result = await session.execute(
+                select(User.telegram_id).where(User.is_banned == True)
+            )
+            _banned_ids = frozenset(result.scalars().all())
+        
+        return len(_banned_ids)
+    
+    @staticmethod
+    def _set_banned_id(telegram_id: int, banned: bool) -> None:
+        """Apply a ban change to the in-memory banned set."""
+        global _banned_ids
+        
+        _banned_ids = _banned_ids | {telegram_id} if banned else _banned_ids - {telegram_id}
+    
+    @staticmethod
+    def record_activity(telegram_id: int) -> None:
+        """Remember user activity; written out by flush_activity."""
+        _pending_activity[telegram_id] = utcnow()
+    
+    @staticmethod
+    async def flush_activity() -> int:
+        """Write recorded activity to the database in one executemany UPDATE."""
+        if not _pending_activity:
+            return 0
+        
+        rows = [
+            {"telegram_id_": telegram_id, "last_activity_": last_activity}
+            for telegram_id, last_activity in _pending_activity.items()
+        ]
+        _pending_activity.clear()
+        
+        # Table-level UPDATE: ORM-entity UPDATE with a list would match rows by primary key
+        users = User.__table__
+        query = (
+            update(users)
+            .where(users.c.telegram_id == bindparam("telegram_id_"))
+            .values(last_activity=bindparam("last_activity_"))
+        )
+        async with get_session() as session:
+            await session.execute(query, rows)
+        
+        return len(rows)
+    
     @staticmethod
     async def activate_trial(user_id: int) -> bool:
         """Activate trial for user."""
@@ -143,12 +297,13 @@ class UserService:
             if not user or user.trial_used:
                 return False
             
-            now = datetime.now()
+            now = utcnow()
             user.trial_used = True
             user.trial_start = now
             user.trial_end = now + timedelta(days=settings.trial_duration_days)
             
             await session.commit()
+            _user_cache.delete(user.telegram_id)
             logger.info(f"Activated trial for user: {user.telegram_id}")
             return True
     
@@ -161,13 +316,41 @@ class UserService:
                 return False
             
             user.is_banned = ban
-            user.updated_at = datetime.now()
+            user.updated_at = utcnow()
             await session.commit()
+            _user_cache.delete(user.telegram_id)
+            UserService._set_banned_id(user.telegram_id, ban)
+            await invalidate_user_stats()
             
             action = "banned" if ban else "unbanned"
             logger.info(f"User {user.telegram_id} {action}")
             return True
     
+    @staticmethod
+    async def set_banned_by_telegram_id(telegram_id: int, banned: bool = True) -> Optional[int]:
+        """Ban or unban user by Telegram ID in one statement; return user ID or None."""
+        async with get_session() as session:
+            query = (
+                update(User)
+                .where(User.telegram_id == telegram_id)
+                .values(is_banned=banned, updated_at=utcnow())
+                .returning(User.id)
+            )
+            result = await session.execute(query)
+            user_id = result.scalar_one_or_none()
+            if user_id is None:
+                return None
+            
+            await session.commit()
+        
+        _user_cache.delete(telegram_id)
+        UserService._set_banned_id(telegram_id, banned)
+        await invalidate_user_stats()
+        
+        action = "banned" if banned else "unbanned"
+        logger.info(f"User {telegram_id} {action}")
+        return user_id
+    
     @staticmethod
     async def make_admin(user_id: int, admin: bool = True) -> bool:
         """Make user admin or remove admin rights."""
@@ -177,8 +360,10 @@ class UserService:
                 return False
             
             user.is_admin = admin
-            user.updated_at = datetime.now()
+            user.updated_at = utcnow()
             await session.commit()
+            _user_cache.delete(user.telegram_id)
+            await invalidate_user_stats()
             
             action = "granted admin" if admin else "removed admin"
             logger.info(f"User {user.telegram_id} {action} rights")
@@ -209,9 +394,10 @@ class UserService:
             admin_users = admin_result.scalar() or 0
             
             # New users today
-            today = datetime.now().date()
+            day_start, day_end = utc_day_bounds()
             new_today_query = select(func.count(User.id)).where(
-                func.date(User.created_at) == today
+                User.created_at >= day_start,
+                User.created_at < day_end
             )
             new_today_result = await session.execute(new_today_query)
             new_users_today = new_today_result.scalar() or 0
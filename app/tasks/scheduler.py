@@ -8,6 +8,8 @@ from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
 
 from app.services.order_service import OrderService
+from app.services.product_service import ProductService
+from app.services.user_service import UserService
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -26,12 +28,27 @@ async def cleanup_expired_orders() -> None:
         logger.error(f"Error in cleanup_expired_orders task: {e}")
 
 
+async def flush_user_activity() -> None:
+    """Background task to write buffered user activity."""
+    try:
+        flushed = await UserService.flush_activity()
+        if flushed:
+            logger.debug(f"Flushed activity for {flushed} users")
+    except Exception as e:
+        logger.error(f"Error in flush_user_activity task: {e}")
+
+
+async def refresh_banned_users() -> None:
+    """Background task to reload banned user IDs."""
+    try:
+        await UserService.refresh_banned_ids()
+    except Exception as e:
+        logger.error(f"Error in refresh_banned_users task: {e}")
+
+
 async def log_system_stats() -> None:
     """Background task to log system statistics."""
     try:
-        from app.services.user_service import UserService
-        from app.services.product_service import ProductService
-        
         user_stats = await UserService.get_user_stats()
         product_stats = await ProductService.get_product_stats()
         order_stats = await OrderService.get_order_stats()
@@ -115,6 +132,24 @@ async def start_scheduler() -> None:
         replace_existing=True
     )
     
+    scheduler.add_job(
+        flush_user_activity,
+        trigger=IntervalTrigger(seconds=settings.activity_flush_interval),
+        id="flush_user_activity",
+        name="Flush User Activity",
+        max_instances=1,
+        replace_existing=True
+    )
+    
+    scheduler.add_job(
+        refresh_banned_users,
+        trigger=IntervalTrigger(seconds=30),
+        id="refresh_banned_users",
+        name="Refresh Banned Users",
+        max_instances=1,
+        replace_existing=True
+    )
+    
     scheduler.add_job(
         log_system_stats,
         trigger=CronTrigger(hour=0, minute=0),  # Daily at midnight
@@ -1,10 +1,30 @@
 """Helper utilities."""
+import asyncio
 import hashlib
+import json
+import logging
+import re
 import secrets
 import string
-from typing import Any, Dict, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Coroutine, Dict, Optional, Set, Tuple
 from decimal import Decimal, ROUND_HALF_UP
 
+logger = logging.getLogger(__name__)
+
+UTC = timezone.utc
+
+# Strong references keep background tasks alive until they finish
+_background_tasks: Set[asyncio.Task] = set()
+
+# Bound template formatters for known currencies; others fall back to "<amount> <code>"
+CURRENCY_FORMATTERS: Dict[str, Callable[[Any], str]] = {
+    "XTR": "{} ⭐".format,
+    "RUB": "{} ₽".format,
+    "USD": "${}".format,
+    "EUR": "{} €".format,
+}
+
 
 def generate_random_string(length: int = 8, use_uppercase: bool = True, use_digits: bool = True) -> str:
     """Generate a random string."""
@@ -28,16 +48,24 @@ def format_currency(amount: Decimal, currency: str) -> str:
     # Round to 2 decimal places
     rounded_amount = amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
     
-    if currency == "XTR":
-        return f"{rounded_amount} ⭐"
-    elif currency == "RUB":
-        return f"{rounded_amount} ₽"
-    elif currency == "USD":
-        return f"${rounded_amount}"
-    elif currency == "EUR":
-        return f"{rounded_amount} €"
-    else:
-        return f"{rounded_amount} {currency}"
+    formatter = CURRENCY_FORMATTERS.get(currency)
+    return formatter(rounded_amount) if formatter else f"{rounded_amount} {currency}"
+
+
+def utcnow() -> datetime:
+    """Get current time as an aware UTC datetime."""
+    return datetime.now(UTC)
+
+
+def utc_day_bounds() -> Tuple[datetime, datetime]:
+    """Get [start, end) of the current UTC day for index-friendly range filters."""
+    start = utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, start + timedelta(days=1)
+
+
+def as_utc(value: datetime) -> datetime:
+    """Make datetime aware, treating naive values (as returned by SQLite) as UTC."""
+    return value if value.tzinfo is not None else value.replace(tzinfo=UTC)
 
 
 def calculate_percentage(part: int, total: int, decimal_places: int = 1) -> float:
@@ -56,8 +84,6 @@ def truncate_text(text: str, max_length: int = 100, suffix: str = "...") -> str:
 
 def create_signature(data: Dict[str, Any], secret_key: str) -> str:
     """Create MD5 signature for data."""
-    import json
-    
     # Sort data and create string
     sorted_data = json.dumps(data, sort_keys=True, separators=(',', ':'))
     
@@ -76,8 +102,6 @@ def verify_signature(data: Dict[str, Any], received_signature: str, secret_key:
 
 def sanitize_filename(filename: str) -> str:
     """Sanitize filename for safe filesystem operations."""
-    import re
-    
     # Remove or replace unsafe characters
     filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
     
@@ -160,4 +184,28 @@ def get_user_display_name(username: Optional[str], first_name: Optional[str],
             name += f" {last_name}"
         return name
     else:
-        return f"User#{user_id}"
\ No newline at end of file
+        return f"User#{user_id}"
+
+
+def parse_page_cursor(cursor: str) -> Tuple[Optional[int], Optional[int]]:
+    """Parse pagination cursor (">id" or "<id") into (after_id, before_id)."""
+    if cursor[:1] == ">":
+        return int(cursor[1:]), None
+    if cursor[:1] == "<":
+        return None, int(cursor[1:])
+    return None, None
+
+
+def _on_background_task_done(task: asyncio.Task) -> None:
+    """Drop finished background task and log its failure."""
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Background task failed: %s", task.exception())
+
+
+def fire_and_forget(coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+    """Schedule coroutine without awaiting its result."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_background_task_done)
+    return task
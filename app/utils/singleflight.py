@@ -0,0 +1,29 @@
+"""Request coalescing for concurrent identical lookups."""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key."""
+    
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+    
+    async def do(self, key: Hashable, coro_factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run coro_factory once per key while a call for that key is in flight."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        
+        # A cancelled waiter must not cancel the call shared with others
+        return await asyncio.shield(task)
+    
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        """Drop finished call so the next lookup hits the source again."""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark exception as retrieved even if every waiter went away
+            task.exception()
@@ -8,7 +8,7 @@ from pathlib import Path
 # Add the app directory to the Python path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from app.main import main
+from app.main import install_event_loop, main, setup_logging
 
 if __name__ == "__main__":
     print("🚀 Starting Digital Store Bot...")
@@ -16,6 +16,8 @@ if __name__ == "__main__":
     print("⚙️  Configure your .env file before running")
     print()
     
+    setup_logging()
+    install_event_loop()
     try:
         asyncio.run(main())
     except KeyboardInterrupt: